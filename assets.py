@@ -0,0 +1,115 @@
+'''
+    Pictures of the interface, resized for the place they are drawn at
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python assets.py
+
+    The sources in data/images are up to 512 px wide while most of them are
+    drawn at 12 to 48 px. The build step writes one optimized PNG per use in
+    data/assets, plus a name@2x.png variant for the HiDPI screens, which
+    is given to the QIcon too. A source already at its drawn size is not
+    copied. The loader reads the built file when it exists and the source
+    otherwise, through the resource bundle of a packaged build, and decodes
+    every QPixmap and QIcon only once.
+'''
+
+import os
+from functools import lru_cache
+from resources import resource_path, resource_bytes, resource_exists, resource_file
+
+SOURCE_FOLDER = "data\\images"
+ASSET_FOLDER = "data\\assets"
+
+# name : (source in SOURCE_FOLDER, size in pixels where it is drawn, scales built)
+ASSETS = {
+    # Qt interface
+    "flag_fr": ("flag_fr.png", (48, 48), (1, 2)),
+    "flag_de": ("flag_de.png", (48, 48), (1, 2)),
+    "flag_en": ("flag_en.png", (48, 48), (1, 2)),
+    "calendar": ("calendar.png", (20, 20), (1, 2)),
+    "close": ("close.png", (20, 20), (1, 2)),
+    "cross": ("cross.png", (20, 20), (1, 2)),
+    "check": ("check.png", (20, 20), (1, 2)),
+    "body": ("body.png", (505, 720), (1,)),
+    # PDF, 12 pt boxes printed at 300 dpi, and the placeholder of a missing logo
+    "box": ("box.png", (50, 50), (1,)),
+    "empty_box": ("empty_box.png", (50, 50), (1,)),
+    "blank": ("blank.png", (8, 8), (1,)),
+}
+
+
+def variant_name(name, scale=1):
+    return f"{name}.png" if scale == 1 else f"{name}@{scale}x.png"
+
+def asset_resource(name, scale=1):
+    # Relative path of the built variant, or of the source when it was not built
+    built = f"{ASSET_FOLDER}\\{variant_name(name, scale)}"
+    if resource_exists(built):
+        return built
+    return f"{SOURCE_FOLDER}\\{ASSETS[name][0]}" if scale == 1 else None
+
+def asset_path(name):
+    # For the readers that need a file, e.g. the style sheet
+    return resource_file(asset_resource(name))
+
+def asset_bytes(name):
+    return resource_bytes(asset_resource(name))
+
+@lru_cache(maxsize=None)
+def pixmap(name, scale=1):
+    from PyQt5.QtGui import QPixmap
+    picture = QPixmap()
+    picture.loadFromData(resource_bytes(asset_resource(name, scale)))
+    picture.setDevicePixelRatio(scale)
+    return picture
+
+@lru_cache(maxsize=None)
+def icon(name):
+    from PyQt5.QtGui import QIcon
+    result = QIcon(pixmap(name))
+    for scale in ASSETS[name][2][1:]:
+        if asset_resource(name, scale):
+            result.addPixmap(pixmap(name, scale))
+    return result
+
+
+def build_asset(name, folder):
+    from PIL import Image
+    source, (width, height), scales = ASSETS[name]
+    picture = Image.open(resource_path(f"{SOURCE_FOLDER}\\{source}")).convert("RGBA")
+    written = []
+    for scale in scales:
+        size = (width*scale, height*scale)
+        if picture.size == size:
+            # Already drawn at its own size, asset_path() falls back to the source
+            continue
+        path = os.path.join(folder, variant_name(name, scale))
+        picture.resize(size, Image.LANCZOS).save(path, optimize=True)
+        written.append(path)
+    return written
+
+def build_assets(names=None):
+    folder = resource_path(ASSET_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for name in names or ASSETS:
+        written += build_asset(name, folder)
+    return written
+
+
+if __name__ == '__main__':
+    for path in build_assets():
+        print(path, os.path.getsize(path))
@@ -0,0 +1,218 @@
+'''
+    Headless rendering of reports from a JSON lines file
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python batch.py reports.jsonl [--output FOLDER | --zip ARCHIVE] [--language fr|en|de]
+                                         [--workers N] [--max-tasks-per-child N]
+                                         [--dpi N] [--quality N] [--cache-dir FOLDER | --no-cache]
+                                         [--stats]
+
+    Every line of the input file is an answer dict, with the keys given by
+    report.report_to_answer(). A line may also carry a "language" key to override
+    the language of its PDF. No Qt module is imported.
+
+    With --workers the reports are spread over a pool of processes. Results
+    are reported in input order and a failing report doesn't stop the others,
+    even when it takes its process down : the reports that process may have
+    had are rendered again one at a time in new processes, and the one that
+    stops its process again is reported as failed.
+
+    With --zip the PDF files are built in memory and written straight into
+    a zip archive, named after the 'name' key of every answer.
+'''
+
+
+
+import argparse
+import json
+import logging
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from translations import available_languages, read_language, load_texts
+from pdf_generator import PDFGenerator, warm_up, pdf_bytes
+from report import report_from_answer, report_to_answer, normalize_answer
+from images import ATTACHMENT_DPI, JPEG_QUALITY, ImageCache
+
+
+def read_answers(path):
+    # (line number, answer, error) for every line, a line that can't be read doesn't stop the others
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, start=1):
+            try:
+                line = line.decode('utf8')
+                if line.strip():
+                    yield number, json.loads(line), None
+            except ValueError as error:
+                yield number, None, f"invalid JSON line: {error}"
+
+def prepare_answer(data, index, texts, language, output=None):
+    language = data.get('language', language)
+    report = report_from_answer(data)
+    if output is not None:
+        report.save = output
+    elif report.save == '':
+        report.save = '.'
+    if report.name == '':
+        report.name = texts[language]['title']+'_'+"-".join(report.date.split('/'))+f"_{index}.pdf"
+    return normalize_answer(report_to_answer(report)), language
+
+def render_answer(answer, texts, language, in_memory=False, **options):
+    # options are passed to PDFGenerator (dpi, quality, image_cache, stats)
+    if in_memory:
+        return answer['name'], pdf_bytes(answer, texts, language, **options)
+    PDFGenerator(answer, texts, language, **options)
+    return os.path.join(answer['save'], answer['name'])
+
+# State of a rendering process, set once by init_worker
+_worker = {}
+
+def init_worker(texts, language, output, dpi=ATTACHMENT_DPI, quality=JPEG_QUALITY, cache_dir=None, in_memory=False, stats=False):
+    # cache_dir: folder of the images.ImageCache, None for the default one, '' to disable it
+    image_cache = True if cache_dir is None else cache_dir and ImageCache(cache_dir)
+    options = dict(dpi=dpi, quality=quality, image_cache=image_cache or None, in_memory=in_memory, stats=stats)
+    if stats:
+        # One JSON line per report on stderr, see PDFGenerator.stats
+        logging.basicConfig(level=logging.INFO, format="%(process)d %(name)s %(message)s")
+    _worker.update(texts=texts, language=language, output=output, options=options)
+    warm_up()
+
+def render_line(item):
+    # Runs in the worker, every error is returned so that the rest of the batch goes on.
+    # A line that could not be parsed comes with its error and is returned as it is.
+    index, data, error = item
+    if error is not None:
+        return index, None, error
+    try:
+        answer, lg = prepare_answer(data, index, _worker['texts'], _worker['language'], _worker['output'])
+        return index, render_answer(answer, _worker['texts'], lg, **_worker['options']), None
+    except Exception as error:
+        return index, None, repr(error)
+
+def render_chunk(items):
+    return [render_line(item) for item in items]
+
+def render_many(answers, texts, language, output=None, workers=1, max_tasks_per_child=None, chunksize=1,
+                dpi=ATTACHMENT_DPI, quality=JPEG_QUALITY, cache_dir=None, in_memory=False, stats=False):
+    """Render the (index, answer, error) tuples of read_answers() and yield (index, result, error)
+    tuples in input order. The result is the path of the PDF, or a (name, bytes) tuple with
+    in_memory=True. workers=1 renders in the current process, None uses one process per CPU."""
+    worker_args = (texts, language, output, dpi, quality, cache_dir, in_memory, stats)
+    if workers == 1:
+        init_worker(*worker_args)
+        yield from map(render_line, answers)
+        return
+
+    def new_pool():
+        return ProcessPoolExecutor(workers, initializer=init_worker, initargs=worker_args,
+                                   max_tasks_per_child=max_tasks_per_child)
+
+    def render_alone(item):
+        nonlocal pool
+        try:
+            return pool.submit(render_line, item).result()
+        except BrokenProcessPool:
+            pool.shutdown()
+            pool = new_pool()
+            return item[0], None, "the rendering process stopped"
+        except Exception as error:
+            return item[0], None, repr(error)
+
+    answers = iter(answers)
+    # (chunk, future) in input order, two chunks per process so that none of them waits
+    pending = deque()
+    pool = new_pool()
+    try:
+        while True:
+            while len(pending) < 2 * (workers or os.cpu_count()):
+                chunk = list(islice(answers, chunksize))
+                if not chunk:
+                    break
+                pending.append((chunk, pool.submit(render_chunk, chunk)))
+            if not pending:
+                return
+            chunk, future = pending.popleft()
+            try:
+                yield from future.result()
+                continue
+            except BrokenProcessPool:
+                pass
+            # A process died (a crash in a native library), which of the reports in flight it had is unknown
+            suspects = [(chunk, future)] + list(pending)
+            pending.clear()
+            pool.shutdown()
+            pool = new_pool()
+            for chunk, future in suspects:
+                if future.exception() is None:
+                    yield from future.result()
+                else:
+                    for item in chunk:
+                        yield render_alone(item)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one PDF report per line of a JSON lines file.")
+    parser.add_argument("input", help="JSON lines file of answer dicts")
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument("-o", "--output", help="folder for the PDF files, overrides the 'save' key of every answer")
+    destination.add_argument("-z", "--zip", help="zip archive receiving the PDF files")
+    parser.add_argument("-l", "--language", choices=available_languages(), help="language of the PDF files, the one of the form by default")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of rendering processes, 0 for one per CPU")
+    parser.add_argument("--max-tasks-per-child", type=int, help="replace a rendering process after this many reports")
+    parser.add_argument("--chunksize", type=int, default=1, help="number of reports sent to a process at once")
+    parser.add_argument("--dpi", type=int, default=ATTACHMENT_DPI, help="resolution of the attachments at their printed size")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality of the re-encoded photos")
+    parser.add_argument("--cache-dir", help="folder of the prepared pictures cache, shared by the workers")
+    parser.add_argument("--no-cache", action="store_true", help="prepare the pictures again for every report")
+    parser.add_argument("--stats", action="store_true", help="log the duration of every stage of every report on stderr")
+    args = parser.parse_args(argv)
+
+    texts = load_texts()
+    language = args.language or read_language()
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+
+    failures = 0
+    results = render_many(read_answers(args.input), texts, language, args.output,
+                          args.workers or None, args.max_tasks_per_child, args.chunksize, args.dpi, args.quality,
+                          '' if args.no_cache else args.cache_dir, args.zip is not None, args.stats)
+    archive = zipfile.ZipFile(args.zip, 'w') if args.zip is not None else None
+    try:
+        for index, result, error in results:
+            if error is not None:
+                failures += 1
+                print(f"line {index}: {error}", file=sys.stderr)
+            elif archive is not None:
+                name, data = result
+                # PDF streams are already compressed
+                archive.writestr(name, data, zipfile.ZIP_STORED)
+                print(f"{args.zip}/{name}")
+            else:
+                print(result)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
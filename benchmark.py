@@ -0,0 +1,222 @@
+'''
+    Benchmark of the PDF generation
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+    Usage: python benchmark.py [--repeat N] [--output results.json]
+                               [--baseline previous.json] [--threshold 0.1]
+                               [scenario ...]
+
+    Every scenario renders a synthetic report in a separate process and
+    reports its wall time (best and median of the runs), the peak resident
+    memory of the process and the size of the PDF. The JSON file also holds
+    the median duration of every stage of PDFGenerator. Results are saved as JSON
+    and can be compared with a previous run: a scenario slower, bigger or
+    heavier than the baseline by more than the threshold is a regression.
+    No Qt module is imported, it runs on a headless server.
+'''
+
+
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from PIL import Image as img
+from resources import resource_path
+from translations import load_texts
+from pdf_generator import PDFGenerator, warm_up
+from report import empty_answer, normalize_answer
+
+
+LONG_TEXT = ("The operator stepped back from the press to clear a jammed part and slipped on oil "
+             "leaking from the hydraulic line, hitting the guard rail with the left arm. ")
+
+# Synthetic attachments : (width, height, format)
+PICTURES = {
+    "small": (800, 600, "JPEG"),
+    "medium": (2000, 1500, "JPEG"),
+    "large": (4000, 3000, "JPEG"),
+    "screenshot": (1920, 1080, "PNG"),
+}
+
+SCENARIOS = {
+    "no_injury_fr": dict(language="fr"),
+    "no_injury_en": dict(language="en"),
+    "no_injury_de": dict(language="de"),
+    "injury_body": dict(language="fr", injury="injury_3", organs=["body_7", "body_12", "body_25", "body_32"]),
+    "injury_body_capture": dict(language="fr", injury="injury_3", organs=["body_7"], capture=True),
+    # A single table cell can't be split across pages, the texts stay within one page
+    "long_description": dict(language="en", description=LONG_TEXT*30, comments=LONG_TEXT*8),
+    "attachment_1_small": dict(language="fr", attachment=["small"]),
+    "attachment_1_large": dict(language="fr", attachment=["large"]),
+    "attachment_1_screenshot": dict(language="fr", attachment=["screenshot"]),
+    "attachment_10_mixed": dict(language="fr", attachment=["small", "medium", "large", "screenshot", "small",
+                                                         "medium", "large", "screenshot", "small", "medium"]),
+    "logo": dict(language="fr", logo=True),
+    "to_file": dict(language="fr", injury="injury_2", organs=["body_1"], to_file=True),
+}
+
+
+def make_picture(folder, name):
+    path = os.path.join(folder, f"{name}.{PICTURES[name][2].lower()}")
+    if not os.path.exists(path):
+        w, h, kind = PICTURES[name]
+        # A gradient with some detail, closer to a photo than flat colours or pure noise
+        picture = img.effect_mandelbrot((w, h), (-2.2, -1.2, 1.0, 1.2), 60).convert('RGB')
+        gradient = img.linear_gradient('L').resize((w, h)).convert('RGB')
+        img.blend(picture, gradient, 0.5).save(path, kind)
+    return path
+
+def make_answer(scenario, folder):
+    answer = empty_answer()
+    answer.update(category="category_1", date="12/03/2024", hour="10:00", place="Hall B",
+                  equipment="Press 4", people="J. Doe", situation=["situation_2", "situation_12"],
+                  description="A part fell from the conveyor.", injury="injury_1",
+                  save=folder, name="benchmark.pdf")
+    answer["report type"] = "report_2"
+    for key in ("injury", "organs", "description", "comments"):
+        if key in scenario:
+            answer[key] = scenario[key]
+    answer["attachment"] = [make_picture(folder, name) for name in scenario.get("attachment", [])]
+    if scenario.get("logo"):
+        answer["logo"] = resource_path("data\\images\\body_original.png")
+    return normalize_answer(answer)
+
+def peak_rss_kb():
+    # ru_maxrss survives exec, it would include the parent process on Linux, VmHWM doesn't
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_scenario(name, repeat, folder):
+    # Runs in its own process, so that the peak memory belongs to this scenario only
+    scenario = SCENARIOS[name]
+    texts = load_texts()
+    answer = make_answer(scenario, folder)
+    options = dict(image_cache=None, stats=True)
+    if scenario.get("capture"):
+        options["body_capture"] = resource_path("data\\images\\body.png")
+    warm_up()
+
+    times = []
+    stages = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if scenario.get("to_file"):
+            generator = PDFGenerator(dict(answer), texts, scenario["language"], **options)
+            size = os.path.getsize(os.path.join(answer["save"], answer["name"]))
+        else:
+            output = BytesIO()
+            generator = PDFGenerator(dict(answer), texts, scenario["language"], output=output, **options)
+            size = len(output.getvalue())
+        times.append(time.perf_counter() - start)
+        for stage, duration in generator.stats.stages.items():
+            stages.setdefault(stage, []).append(duration)
+
+    return {
+        "best": min(times),
+        "median": statistics.median(times),
+        "peak_rss_kb": peak_rss_kb(),
+        "pdf_bytes": size,
+        "stages": {stage: statistics.median(durations) for stage, durations in stages.items()},
+    }
+
+def run_in_process(name, repeat, folder):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--repeat", str(repeat), "--folder", folder],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in ("median", "peak_rss_kb", "pdf_bytes"):
+            before, after = baseline[name][key], result[key]
+            if before and (after - before) / before > threshold:
+                regressions.append(f"{name}: {key} {before:.6g} -> {after:.6g} (+{(after - before) / before:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the PDF generation.")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run, all by default : {', '.join(SCENARIOS)}")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="number of PDF generated per scenario")
+    parser.add_argument("-o", "--output", help="JSON file receiving the results")
+    parser.add_argument("-b", "--baseline", help="JSON file of a previous run to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="relative increase counted as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.repeat, args.folder)))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        # Created here so that the scenarios only measure the report generation
+        for name in PICTURES:
+            make_picture(folder, name)
+        print(f"{'scenario':<26}{'best (ms)':>11}{'median (ms)':>13}{'peak RSS (MB)':>15}{'PDF (KB)':>10}")
+        for name in names:
+            try:
+                result = results[name] = run_in_process(name, args.repeat, folder)
+            except RuntimeError as error:
+                failures.append(str(error))
+                print(f"{name:<26}failed")
+                continue
+            print(f"{name:<26}{result['best']*1000:>11.1f}{result['median']*1000:>13.1f}"
+                  f"{result['peak_rss_kb']/1024:>15.1f}{result['pdf_bytes']/1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "repeat": args.repeat, "results": results}, f, indent=2)
+
+    for error in failures:
+        print(error, file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print("regression", line)
+    return 1 if regressions or failures else 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+'''
+    Geometry of the body diagram (data/images/body.png)
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+# Size of data/images/body.png, the picture is centered in a view of BODY_VIEW_SIZE
+BODY_IMAGE_SIZE = (505, 720)
+BODY_VIEW_SIZE = (505, 730)
+
+# Label map of the organs, one region number per pixel of the picture (0 outside), built by running this module
+BODY_LABELS = "data\\images\\body_regions.png"
+# The labels are 8 bits (an L mode PNG, drawn by the form as an Indexed8 picture), so at most 255 regions
+MAX_REGIONS = 255
+# Margin around the silhouette that still counts as a click on the organ
+SILHOUETTE_MARGIN = 3
+
+# Box of every organ on the picture : (x, y, width, height), cut to the silhouette in the label map
+BODY_REGIONS = {
+    "body_1": (85, 20, 63, 30),
+    "body_2": (97, 50, 16, 13),
+    "body_3": (119, 50, 16, 13),
+    "body_4": (78, 60, 17, 29),
+    "body_5": (138, 60, 17, 29),
+    "body_6": (107, 62, 17, 14),
+    "body_7": (103, 76, 26, 14),
+    "body_8": (99, 90, 35, 16),
+    "body_9": (93, 105, 47, 36),
+    "body_10": (63, 140, 107, 101),
+    "body_11": (60, 242, 113, 91),
+    "body_12": (48, 350, 61, 133),
+    "body_13": (125, 350, 61, 133),
+    "body_14": (48, 484, 61, 58),
+    "body_15": (125, 484, 61, 58),
+    "body_16": (43, 543, 58, 109),
+    "body_17": (133, 543, 58, 109),
+    "body_18": (61, 655, 39, 34),
+    "body_19": (134, 655, 39, 34),
+    "body_20": (52, 688, 49, 33),
+    "body_21": (133, 688, 49, 33),
+    "body_22": (28, 137, 35, 60),
+    "body_23": (170, 137, 35, 60),
+    "body_24": (7, 197, 53, 138),
+    "body_25": (171, 197, 53, 138),
+    "body_26": (0, 335, 32, 29),
+    "body_27": (203, 335, 32, 29),
+    "body_28": (0, 363, 37, 66),
+    "body_29": (201, 363, 37, 66),
+    "body_30": (360, 18, 62, 60),
+    "body_31": (329, 78, 126, 53),
+    "body_32": (332, 132, 119, 161),
+    "body_33": (323, 293, 136, 80),
+    "body_34": (317, 517, 55, 176),
+    "body_35": (408, 517, 55, 176),
+}
+
+def region_center(name):
+    x, y, w, h = BODY_REGIONS[name]
+    return x + w/2, y + h/2
+
+def region_label(name):
+    return int(name.split('_')[1])
+
+def region_name(label):
+    return f"body_{label}" if label else None
+
+
+class LabelMap:
+    # Region under a point of the picture, read from the rows of BODY_LABELS (8 bits per pixel)
+    def __init__(self, labels, width, height, stride=None):
+        self.labels = labels
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+
+    def label_at(self, x, y):
+        x, y = int(x), int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.labels[y*self.stride + x]
+        return 0
+
+    def region_at(self, x, y):
+        return region_name(self.label_at(x, y))
+
+
+def build_label_map(body_path, output_path):
+    from PIL import Image, ImageFilter
+    if max(region_label(name) for name in BODY_REGIONS) > MAX_REGIONS:
+        raise ValueError(f"the label map holds region numbers up to {MAX_REGIONS}")
+    body = Image.open(body_path).convert("RGBA")
+    silhouette = body.getchannel("A").point(lambda alpha: 255 if alpha > 16 else 0)
+    silhouette = silhouette.filter(ImageFilter.MaxFilter(2*SILHOUETTE_MARGIN + 1))
+    labels = Image.new("L", body.size, 0)
+    # The smallest boxes are painted last, so an organ inside a larger box keeps its own pixels
+    for name, (x, y, w, h) in sorted(BODY_REGIONS.items(), key=lambda item: -item[1][2]*item[1][3]):
+        box = (x, y, x + w, y + h)
+        labels.paste(region_label(name), box, silhouette.crop(box))
+    labels.save(output_path, optimize=True)
+    return labels
+
+
+if __name__ == '__main__':
+    from resources import resource_path
+    build_label_map(resource_path("data\\images\\body.png"), resource_path(BODY_LABELS))
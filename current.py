@@ -18,104 +18,179 @@
 
 
 
-from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout, QWidget, QCheckBox, QLineEdit, QFrame, QCalendarWidget, QDialog, QTimeEdit, QDateEdit, QAbstractSpinBox, QTextEdit, QScrollArea, QGraphicsView, QGraphicsScene, QGraphicsProxyWidget, QFileDialog
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QCursor
+from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout, QWidget, QCheckBox, QLineEdit, QFrame, QCalendarWidget, QDialog, QTimeEdit, QDateEdit, QAbstractSpinBox, QTextEdit, QScrollArea, QGraphicsView, QGraphicsScene, QGraphicsObject, QFileDialog, QProgressDialog, QMessageBox
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QCursor, QImage, qRgba
 from PyQt5 import QtCore
 import sys
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Spacer, Table, TableStyle, Image, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-from PIL import Image as img
 import os
 from pathlib import Path
-from PyPDF2 import PdfReader, PdfWriter
+import threading
+from resources import resource_bytes
+from translations import read_language, write_language, load_texts
+from report import Report, report_to_answer, normalize_answer, selection_bit, mask_to_names
+from body_regions import BODY_LABELS, LabelMap, region_center, region_label
+from theme import ACCENT_COLOR, BACKGROUND_COLOR, stylesheet
+from assets import icon, pixmap
+
+class BodyMap(QGraphicsObject):
+    # Organs of the body picture, the one under the mouse is read from the label map and highlighted with it
+    clicked = QtCore.pyqtSignal(str)
+
+    def __init__(self, label_map, cross):
+        super().__init__()
+        self.label_map = label_map
+        self.cross = cross
+        # The label map seen as an indexed image : the colour of a region is picked in the colour table
+        self.highlight = QImage(label_map.labels, label_map.width, label_map.height, label_map.stride, QImage.Format_Indexed8)
+        self.hovered = None
+        self.selected = set()
+        self.setAcceptHoverEvents(True)
+        self.setAcceptedMouseButtons(QtCore.Qt.LeftButton)
+
+    def boundingRect(self):
+        return QtCore.QRectF(0, 0, self.label_map.width, self.label_map.height)
+
+    def paint(self, painter, option, widget=None):
+        if not self.selected and self.hovered is None:
+            return
+        colors = [0] * 256
+        for name in self.selected:
+            colors[region_label(name)] = qRgba(244, 67, 54, 50)
+        if self.hovered is not None:
+            colors[region_label(self.hovered)] = qRgba(244, 67, 54, 90)
+        self.highlight.setColorTable(colors)
+        painter.drawImage(0, 0, self.highlight)
+        for name in self.selected | {self.hovered} - {None}:
+            size = 20 if name == self.hovered else 13
+            target = QtCore.QRectF(0, 0, size, size)
+            target.moveCenter(QtCore.QPointF(*region_center(name)))
+            painter.drawPixmap(target.toRect(), self.cross.pixmap(size, size))
+
+    def set_activated(self, name, activated):
+        if activated:
+            self.selected.add(name)
+        else:
+            self.selected.discard(name)
+        self.update()
+
+    def clear(self):
+        self.selected.clear()
+        self.update()
+
+    def hover(self, name):
+        if name != self.hovered:
+            self.hovered = name
+            if name is None:
+                self.unsetCursor()
+            else:
+                self.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
+            self.update()
 
+    def hoverMoveEvent(self, event):
+        self.hover(self.label_map.region_at(event.pos().x(), event.pos().y()))
 
-system = 'linux'
+    def hoverLeaveEvent(self, event):
+        self.hover(None)
 
-# https://stackoverflow.com/questions/31836104/pyinstaller-and-onefile-how-to-include-an-image-in-the-exe-file
-def resource_path(relative_path):
-    if system == 'linux':
-        return '/'.join(relative_path.split('\\'))
-    else:
-        return relative_path
+    def mousePressEvent(self, event):
+        if self.label_map.region_at(event.pos().x(), event.pos().y()) is None:
+            event.ignore()
 
-class IconButton(QPushButton):
-    def __init__(self, blank, cross, parent=None):
-        super().__init__(parent)
-        self.blank = blank
-        self.cross = cross
-        self.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
-        self.setFixedSize(25, 25)
-        self.setIcon(self.cross)
-        self.none_size = QtCore.QSize(0, 0)
-        self.full_size = QtCore.QSize(20, 20)
-
-        self.setIconSize(self.none_size)
-        self.setStyleSheet("""
-            border: none;
-            background-color: transparent;
-            padding: 100px;
-            
-        """)
-        self.activated = False
-
-    def enterEvent(self, event):
-        self.setIconSize(self.full_size)
-
-    def leaveEvent(self, event):
-        self.setIconSize(self.none_size)
+    def mouseReleaseEvent(self, event):
+        name = self.label_map.region_at(event.pos().x(), event.pos().y())
+        if name is not None:
+            self.clicked.emit(name)
+
+
+def load_label_map():
+    image = QImage.fromData(resource_bytes(BODY_LABELS)).convertToFormat(QImage.Format_Grayscale8)
+    labels = bytes(image.constBits().asarray(image.sizeInBytes()))
+    return LabelMap(labels, image.width(), image.height(), image.bytesPerLine())
+
+
+class ExportSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(str, int, int)
+    finished = QtCore.pyqtSignal(str)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+class ExportWorker(QtCore.QRunnable):
+    # Builds the PDF on a thread of the pool, the signals are delivered on the GUI thread
+    def __init__(self, answer, texts, language):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.answer, self.texts, self.language = answer, texts, language
+        self.steps = 6 + len(answer['attachment'])
+        self.signals = ExportSignals()
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def run(self):
+        from pdf_generator import PDFGenerator, ExportCancelled
+        try:
+            PDFGenerator(self.answer, self.texts, self.language,
+                         progress=self.signals.progress.emit, cancelled=lambda: self.cancel_requested)
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(os.path.join(self.answer['save'], self.answer['name']))
+
+class FirstPaint(QtCore.QObject):
+    # Calls back once the event loop is idle after the first paint of the widget
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QtCore.QEvent.Paint:
+            watched.removeEventFilter(self)
+            QtCore.QTimer.singleShot(0, self.callback)
+        return False
+
+def prewarm_export():
+    # reportlab and PIL are only needed to export, they are loaded in the background once the window is up
+    import pdf_generator
+    pdf_generator.warm_up()
 
         
 class ReportFormApp:
     def __init__(self):
-        with open(resource_path('data\\texts\\lg.txt'), 'r') as f:
-            self.language = f.read()
+        self.language = read_language()
         self.display_body = False
+        self.body_panel = None
         self.translatable = {}
-        self.accent_color = 'teal'
-        self.background_color = "#e4fffd"
-
-        self.texts = {}
-
-        for lg in ("fr", "en", "de"):
-            with open(resource_path(f"data\\texts\\{lg}.txt"), 'r', encoding='utf8') as fichier:
-                tab = [line[:-1].split(" = ") for line in fichier.readlines()]
-                self.texts[lg] = {line[0] : line[1] for line in tab}
-
-        self.answer = {
-            "category": "",
-            "report type": "",
-            "date": "",
-            "hour": "",
-            "place": "",
-            "equipment": "",
-            "people": "",
-            "situation": [],
-            "description": "",
-            "injury": "",
-            "organs": [],
-            "comments" : "",
-            "logo" : "",
-            "attachment" : [],
-            "save" : "",
-            "name" : ""
-        }
+        self.accent_color = ACCENT_COLOR
+        self.background_color = BACKGROUND_COLOR
+
+        self.texts = load_texts((self.language,))
+
+        self.report = Report()
+        self.store = None
 
         self.app = QApplication([])
         self.window = QWidget()
+        self.window.setObjectName("form")
         self.window.setWindowTitle("Fiche de compte-rendu accident / presque accident / danger")
 
+        self.apply_style()
         self.create_widgets()
         self.center_window()
-        self.apply_style()
         self.setup_layout()
 
+        FirstPaint(self.window, self.after_first_paint)
         self.window.show()
         sys.exit(self.app.exec())
 
+    def after_first_paint(self):
+        threading.Thread(target=prewarm_export, daemon=True).start()
+        # Built while the user reads the form, so that the first injury shows it at once
+        QtCore.QTimer.singleShot(0, self.create_body_panel)
+
     def create_widgets(self):
         self.header_layout = self.create_header_layout()
         self.question_1_layout, self.category_checkboxes, self.report_checkboxes = self.create_question_1_layout()
@@ -131,6 +206,22 @@ class ReportFormApp:
         self.export_button.clicked.connect(self.export)
         self.translatable["export"] = self.export_button
 
+        self.bind_report()
+
+    def bind_report(self):
+        # The text fields write to self.report as they are edited, export() only reads it
+        def bind(field, signal, read):
+            signal.connect(lambda *_: setattr(self.report, field, read()))
+            setattr(self.report, field, read())
+        bind("people", self.people_box.textChanged, self.people_box.text)
+        bind("date", self.info_boxes["date"].dateChanged, self.info_boxes["date"].text)
+        bind("hour", self.info_boxes["hour"].timeChanged, self.info_boxes["hour"].text)
+        bind("place", self.info_boxes["place"].textChanged, self.info_boxes["place"].text)
+        bind("equipment", self.info_boxes["equipment"].textChanged, self.info_boxes["equipment"].text)
+        bind("other_situation", self.situation_input.textChanged, self.situation_input.text)
+        bind("description", self.description_box.textChanged, lambda: self.description_box.toPlainText().replace('\u200e', ''))
+        bind("comments", self.comment_box.textChanged, self.comment_box.toPlainText)
+
     def center_window(self):
         screen_geometry = self.app.desktop().screenGeometry()
         window_width = 1_000
@@ -140,8 +231,11 @@ class ReportFormApp:
         self.window.setGeometry(x, y, window_width, window_height)
 
     def apply_style(self):
-        self.window.setWindowIcon(QIcon(resource_path("icon.ico")))
-        self.window.setStyleSheet(f"background: {self.background_color}")
+        # Decoded from its bytes, a packaged build writes no copy of it
+        window_icon = QPixmap()
+        window_icon.loadFromData(resource_bytes("icon.ico"))
+        self.window.setWindowIcon(QIcon(window_icon))
+        self.app.setStyleSheet(stylesheet(self.accent_color, self.background_color))
 
     def setup_layout(self):
         self.main_layout = QVBoxLayout()
@@ -187,39 +281,7 @@ class ReportFormApp:
         # Create the scroll area and set its widget to the scrollable widget
         scroll_area = QScrollArea()
         scroll_area.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
-                border: none;
-                margin-top: 10px;
-                margin-bottom: 10px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background-color: transparent;  
-                width: 19px;
-                margin: 0px 10px 0px 0px;
-            }
-            QScrollBar:vertical:hover {
-                border-radius: 7px;
-                background-color: #dadada;
-                margin: 0px 5px 0px 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: teal;  
-                min-height: 20px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical:hover {
-                border-radius: 7px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                border: none;
-                background-color: transparent;
-                height: 12px;
-                subcontrol-position: top;
-                subcontrol-origin: margin;
-            }
-                                  """)
+        scroll_area.setObjectName("content")
         
         scroll_area.setWidget(scroll_widget)
         scroll_area.setWidgetResizable(True)
@@ -245,11 +307,10 @@ class ReportFormApp:
             button = QPushButton()
             button.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
             #button.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
-            icon = QIcon(resource_path(f"data\\images\\flag_{lg}.png"))
-            button.setIcon(icon)
+            button.setIcon(icon(f"flag_{lg}"))
             button.setFixedSize(QtCore.QSize(64, 64))
             button.setIconSize(QtCore.QSize(48, 48))
-            button.setStyleSheet("border-style: 15px 'white' solid;" + "padding-left: 10px;")
+            button.setObjectName("flag")
             button.clicked.connect(lambda _, lg=lg: self.switch_language(lg))
             flag_layout.addWidget(button)
 
@@ -260,16 +321,7 @@ class ReportFormApp:
         self.title.setMinimumWidth(900)
         self.title.setMaximumWidth(1100)
         self.title.setFixedHeight(80)
-        self.title.setStyleSheet(
-            f"background: {self.accent_color};"
-            "font-size: 36px;"
-            "font-family: Ubuntu;"
-            "border-radius: 20px;"
-            "padding: 15%;"
-            "color: 'white';"
-            "margin-left: 80px;"
-            "margin-right: 80px;"
-        )
+        self.title.setObjectName("title")
         self.translatable["title"] = (self.title)
         header_layout.addWidget(self.title)
 
@@ -349,29 +401,22 @@ class ReportFormApp:
                 info_layout.addWidget(boxes[q], i, 1, 1, 2)
 
         boxes["date"] = QDateEdit()
+        # dd/MM/yyyy whatever the locale, open_calendar() and the stored reports read it back
+        boxes["date"].setDisplayFormat("dd/MM/yyyy")
         boxes["date"].setDate(QtCore.QDate.currentDate())
         boxes["date"].setButtonSymbols(QAbstractSpinBox.NoButtons)
         
-        boxes["date"].setStyleSheet(
-            f"border: 2px solid {self.accent_color};"
-            "border-radius: 5px;"
-            "padding-top: 5px;"
-            "padding-bottom: 5px;"
-            "padding-left: 5px;"
-            "padding-right: 10px;"
-            "background-color: white;"
-            "font-size: 16px;"
-        )
+        boxes["date"].setObjectName("date_input")
         info_layout.addWidget(boxes["date"], 0, 1, 1, 2)
 
 
         calendar_button = QPushButton()
-        icon = QIcon(resource_path("data\\images\\calendar.png"))      # Icon found on https://www.freepik.com/icon/calendar_55281#fromView=keyword&term=Calendar&page=1&position=6 Icon by Freepik
-        calendar_button.setIcon(icon)
+        # Calendar icon found on https://www.freepik.com/icon/calendar_55281#fromView=keyword&term=Calendar&page=1&position=6 Icon by Freepik
+        calendar_button.setIcon(icon("calendar"))
         calendar_button.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
         calendar_button.setFixedSize(35, 35)
         calendar_button.setIconSize(QtCore.QSize(20, 20))
-        calendar_button.setStyleSheet("border-radius: 5px; background-color: none;")
+        calendar_button.setObjectName("calendar_button")
         calendar_button.clicked.connect(self.open_calendar)
 
         info_layout.addWidget(calendar_button, 0, 2)
@@ -379,16 +424,7 @@ class ReportFormApp:
         boxes["hour"] = QTimeEdit()
         boxes["hour"].setTime(QtCore.QTime.currentTime())
         boxes["hour"].setButtonSymbols(QAbstractSpinBox.NoButtons)
-        boxes["hour"].setStyleSheet(
-            f"border: 2px solid {self.accent_color};"
-            "border-radius: 5px;"
-            "padding-top: 5px;"
-            "padding-bottom: 5px;"
-            "padding-left: 5px;"
-            "padding-right: 10px;"
-            "background-color: white;"
-            "font-size: 16px;"
-        )
+        boxes["hour"].setObjectName("date_input")
         info_layout.addWidget(boxes["hour"], 1, 1, 1, 2)
 
 
@@ -439,11 +475,8 @@ class ReportFormApp:
         other_layout.addWidget(checkboxes["situation_30"])
 
         self.situation_input = QLineEdit()
+        self.situation_input.setObjectName("other_situation")
         self.situation_input.setEnabled(False)
-        self.situation_input.setStyleSheet(
-            "border: none;"
-            "background-color: transparent;"
-        )
         other_layout.addWidget(self.situation_input)
 
         situation_layout.addLayout(other_layout, 15, 1)
@@ -502,46 +535,40 @@ class ReportFormApp:
 
         return injury_layout, comments_input
     
-    def create_body_layout(self):
-        body_layout = QVBoxLayout()
+    def create_body_panel(self):
+        # Built once and kept, the injury checkboxes only show and hide it
+        if self.body_panel is not None:
+            return self.body_panel
+        self.body_panel = QWidget()
+        body_layout = QVBoxLayout(self.body_panel)
+        body_layout.setContentsMargins(0, 0, 0, 0)
 
         body_0 = self.create_subtitle(self.texts[self.language]["body_0"])
         self.translatable["body_0"] = body_0
         body_layout.addWidget(body_0)
 
-        text = "" if self.answer["organs"] == [] else self.texts[self.language]["body_36"] + " ".join([f"{org}," for org in self.answer["organs"]])[:-1]
-
-        body_36 = QLabel(text)
+        body_36 = QLabel("")
         body_36.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         body_36.setWordWrap(True)
-        body_36.setStyleSheet(
-            "font-size: 16px"
-        )
+        body_36.setObjectName("selected_organs")
         self.translatable["body_36"] = body_36
         body_layout.addWidget(body_36)
 
         body_37 = self.create_button(self.texts[self.language]["body_37"])
-        body_37.setStyleSheet(
-                    "border: 2px solid grey;"
-                    "border-radius: 5px;"
-                    "background: grey;"
-                    "padding-top: 5px;"
-                    "padding-bottom: 5px;"
-                    "color: white;"
-                    "margin-top: 0px;"
-                    "margin-bottom: 0px;"
-                    "font-size: 16px"
-                )
+        body_37.setObjectName("clear_body")
         body_37.setEnabled(False)
         body_37.clicked.connect(self.clear_body)
         self.translatable["body_37"] = body_37
         body_layout.addWidget(body_37, alignment=QtCore.Qt.AlignCenter)
         
-        image_view = self.create_body_image()
-        body_layout.addWidget(image_view, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.body_image = self.create_body_image()
+        body_layout.addWidget(self.body_image, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
 
+        self.body_panel.hide()
+        self.body_panel.ensurePolished()
+        self.harm_layout.addWidget(self.body_panel, stretch=1)
 
-        return body_layout, image_view
+        return self.body_panel
     
     def create_attachment_layout(self):
         attachment_layout = QVBoxLayout()
@@ -572,113 +599,18 @@ class ReportFormApp:
     def create_checkbox(self, text):
         checkbox = QCheckBox(text)
         checkbox.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
-        url = resource_path('data/images/check.png')
-        style = """
-            QCheckBox {
-                spacing: 5px;
-                font-size: 15px;
-            }
-            QCheckBox::indicator {
-                width: 20px;
-                height: 20px;
-                border: 2px solid teal;
-                border-radius: 4px;
-                background-color: white;
-            }
-            QCheckBox::indicator:unchecked:hover {
-                background-color: #e4fffd;
-            }
-            QCheckBox::indicator:checked {
-                background-color: teal;
-        """
-        image = f"    image: url('{url}')}}"
-        checkbox.setStyleSheet(style+image)
+        checkbox.setObjectName("choice")
         return checkbox
     
     def create_text_input(self):
         box = QLineEdit()
         box.setCursor(QtCore.Qt.CursorShape.IBeamCursor)
-        box.setStyleSheet(
-            f"border: 2px solid {self.accent_color};"
-            "border-radius: 5px;"
-            "padding-top: 5px;"
-            "padding-bottom: 5px;"
-            "padding-left: 10px;"
-            "padding-right: 10px;"
-            "background-color: white;"
-            "font-size: 16px"
-        )
+        box.setObjectName("input")
         return box
     
     def create_large_text_input(self):
         input = QTextEdit()
-        input.setStyleSheet("""
-            QTextEdit {
-                border: 2px solid teal;
-                border-radius: 5px;
-                padding-top: 5px;
-                padding-bottom: 5px;
-                padding-left: 10px;
-                padding-right: 10px;
-                background-color: white;
-                font-size: 16px;
-                line-height: 20px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                border-radius: 4px;
-                background-color: white;
-                width: 10px;
-                margin: 0px 3px 0px 0px;
-            }
-            QScrollBar:vertical:hover {
-                border-radius: 5px;
-                background-color: #dadada;
-                margin: 0px 0px 0px 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: teal;  /* Couleur de la poignée */
-                min-height: 20px;
-                border-radius: 3px;
-            }
-            QScrollBar::handle:vertical:hover {
-                border-radius: 5px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                border: none;
-                background-color: transparent;
-                height: 12px;
-                subcontrol-position: top;
-                subcontrol-origin: margin;
-            }
-            QScrollBar:horizontal {
-                border: none;
-                border-radius: 4px;
-                background-color: white;
-                height: 10px;
-                margin: 0px 0px 3px 0px;
-            }
-            QScrollBar:horizontal:hover {
-                border-radius: 5px;
-                background-color: #dadada;
-                margin: 0px 0px 0px 0px;
-            }
-            QScrollBar::handle:horizontal {
-                background-color: teal;  /* Couleur de la poignée */
-                min-width: 20px;
-                border-radius: 3px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                border-radius: 5px;
-            }
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                border: none;
-                background-color: transparent;
-                width: 12px;
-                subcontrol-position: left;
-                subcontrol-origin: margin;
-            }
-                                        """)
+        input.setObjectName("text_area")
         
         return input
     
@@ -687,17 +619,7 @@ class ReportFormApp:
         button.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
         button.setMinimumWidth(200)
         button.setMaximumWidth(500)
-        button.setStyleSheet(
-            f"border: 2px solid {self.accent_color};"
-            "border-radius: 5px;"
-            f"background: {self.accent_color};"
-            "padding-top: 10px;"
-            "padding-bottom: 10px;"
-            "color: white;"
-            "margin-top: 0px;"
-            "margin-bottom: 0px;"
-            "font-size: 16px;"
-        )
+        button.setObjectName("button")
 
         return button
 
@@ -706,11 +628,7 @@ class ReportFormApp:
         separator_line.setFrameShape(QFrame.VLine)
         separator_line.setFrameShadow(QFrame.Sunken)
         separator_line.setFixedWidth(12)
-        separator_line.setStyleSheet(
-            "background-color: black;"
-            "margin-left: 10px;"
-            "padding-right: 150px;"
-            )
+        separator_line.setObjectName("v_separator")
         return separator_line
     
     def create_h_separator(self):
@@ -718,22 +636,14 @@ class ReportFormApp:
         separator_line.setFrameShape(QFrame.HLine)
         separator_line.setFrameShadow(QFrame.Sunken)
         separator_line.setFixedHeight(17)
-        separator_line.setStyleSheet(
-            "background-color: black;"
-            "margin-top: 15px;"
-        )
+        separator_line.setObjectName("h_separator")
         return separator_line
 
     def create_subtitle(self, text:str):
         subtitle = QLabel(text)
         subtitle.setWordWrap(True)
         subtitle.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        subtitle.setStyleSheet(
-            "margin: 20px;"
-            "color: black;"
-            "font-size: 20px;"
-            "text-decoration: underline;"
-        )
+        subtitle.setObjectName("subtitle")
         return subtitle
 
 
@@ -763,79 +673,26 @@ class ReportFormApp:
         scene = QGraphicsScene(image_view)
         image_view.setScene(scene)
         image_view.setFixedHeight(730)
-        image_view.setStyleSheet("border:none;")
+        image_view.setObjectName("body_view")
         image_view.setRenderHint(QPainter.Antialiasing)
 
         # Charger l'image et la définir comme arrière-plan
-        image = QPixmap(resource_path("data\\images\\body.png"))
-        scene.addPixmap(image)
+        scene.addPixmap(pixmap("body"))
 
-        self.body_buttons = {}
-        blank = QIcon(resource_path("data\\images\\blank.png"))
-        cross = QIcon(resource_path("data\\images\\cross.png"))
-        
-        for i in range(1, 36):
-            button = IconButton(blank=blank, cross=cross)
-            self.body_buttons[f"body_{i}"] = button
-            self.body_buttons[f"body_{i}"].clicked.connect(lambda _, name=f"body_{i}", button = self.body_buttons[f"body_{i}"]: self.update_body_state(name, button))
-
-        # Créer et positionner les boutons sur l'image
-        #self.body_buttons["body_1"].setFixedSize(30, 20)
-
-        self.body_buttons["body_1"].setFixedSize(63, 30); self.add_button(scene, self.body_buttons["body_1"], QtCore.QPointF(85, 20))
-        self.body_buttons["body_2"].setFixedSize(16, 13); self.add_button(scene, self.body_buttons["body_2"], QtCore.QPointF(97, 50))
-        self.body_buttons["body_3"].setFixedSize(16, 13); self.add_button(scene, self.body_buttons["body_3"], QtCore.QPointF(119, 50))
-        self.body_buttons["body_4"].setFixedSize(17, 29); self.add_button(scene, self.body_buttons["body_4"], QtCore.QPointF(78, 60))
-        self.body_buttons["body_5"].setFixedSize(17, 29); self.add_button(scene, self.body_buttons["body_5"], QtCore.QPointF(138, 60))
-        self.body_buttons["body_6"].setFixedSize(17, 14); self.add_button(scene, self.body_buttons["body_6"], QtCore.QPointF(107, 62))
-        self.body_buttons["body_7"].setFixedSize(26, 14); self.add_button(scene, self.body_buttons["body_7"], QtCore.QPointF(103, 76))
-        self.body_buttons["body_8"].setFixedSize(35, 16); self.add_button(scene, self.body_buttons["body_8"], QtCore.QPointF(99, 90))
-        self.body_buttons["body_9"].setFixedSize(47, 36); self.add_button(scene, self.body_buttons["body_9"], QtCore.QPointF(93, 105))
-        self.body_buttons["body_10"].setFixedSize(107, 101); self.add_button(scene, self.body_buttons["body_10"], QtCore.QPointF(63, 140))
-        self.body_buttons["body_11"].setFixedSize(113, 91); self.add_button(scene, self.body_buttons["body_11"], QtCore.QPointF(60, 242))
-        self.body_buttons["body_12"].setFixedSize(61, 133); self.add_button(scene, self.body_buttons["body_12"], QtCore.QPointF(48, 350))
-        self.body_buttons["body_13"].setFixedSize(61, 133); self.add_button(scene, self.body_buttons["body_13"], QtCore.QPointF(125, 350))
-        self.body_buttons["body_14"].setFixedSize(61, 58); self.add_button(scene, self.body_buttons["body_14"], QtCore.QPointF(48, 484))
-        self.body_buttons["body_15"].setFixedSize(61, 58); self.add_button(scene, self.body_buttons["body_15"], QtCore.QPointF(125, 484))
-        self.body_buttons["body_16"].setFixedSize(58, 109); self.add_button(scene, self.body_buttons["body_16"], QtCore.QPointF(43, 543))
-        self.body_buttons["body_17"].setFixedSize(58, 109); self.add_button(scene, self.body_buttons["body_17"], QtCore.QPointF(133, 543))
-        self.body_buttons["body_18"].setFixedSize(39, 34); self.add_button(scene, self.body_buttons["body_18"], QtCore.QPointF(61, 655))
-        self.body_buttons["body_19"].setFixedSize(39, 34); self.add_button(scene, self.body_buttons["body_19"], QtCore.QPointF(134, 655))
-        self.body_buttons["body_20"].setFixedSize(49, 33); self.add_button(scene, self.body_buttons["body_20"], QtCore.QPointF(52, 688))
-        self.body_buttons["body_21"].setFixedSize(49, 33); self.add_button(scene, self.body_buttons["body_21"], QtCore.QPointF(133, 688))
-        self.body_buttons["body_22"].setFixedSize(35, 60); self.add_button(scene, self.body_buttons["body_22"], QtCore.QPointF(28, 137))
-        self.body_buttons["body_23"].setFixedSize(35, 60); self.add_button(scene, self.body_buttons["body_23"], QtCore.QPointF(170, 137))
-        self.body_buttons["body_24"].setFixedSize(53, 138); self.add_button(scene, self.body_buttons["body_24"], QtCore.QPointF(7, 197))
-        self.body_buttons["body_25"].setFixedSize(53, 138); self.add_button(scene, self.body_buttons["body_25"], QtCore.QPointF(171, 197))
-        self.body_buttons["body_26"].setFixedSize(32, 29); self.add_button(scene, self.body_buttons["body_26"], QtCore.QPointF(0, 335))
-        self.body_buttons["body_27"].setFixedSize(32, 29); self.add_button(scene, self.body_buttons["body_27"], QtCore.QPointF(203, 335))
-        self.body_buttons["body_28"].setFixedSize(37, 66); self.add_button(scene, self.body_buttons["body_28"], QtCore.QPointF(0, 363))
-        self.body_buttons["body_29"].setFixedSize(37, 66); self.add_button(scene, self.body_buttons["body_29"], QtCore.QPointF(201, 363))
-        self.body_buttons["body_30"].setFixedSize(62, 60); self.add_button(scene, self.body_buttons["body_30"], QtCore.QPointF(360, 18))
-        self.body_buttons["body_31"].setFixedSize(126, 53); self.add_button(scene, self.body_buttons["body_31"], QtCore.QPointF(329, 78))
-        self.body_buttons["body_32"].setFixedSize(119, 161); self.add_button(scene, self.body_buttons["body_32"], QtCore.QPointF(332, 132))
-        self.body_buttons["body_33"].setFixedSize(136, 80); self.add_button(scene, self.body_buttons["body_33"], QtCore.QPointF(323, 293))
-        self.body_buttons["body_34"].setFixedSize(55, 176); self.add_button(scene, self.body_buttons["body_34"], QtCore.QPointF(317, 517))
-        self.body_buttons["body_35"].setFixedSize(55, 176); self.add_button(scene, self.body_buttons["body_35"], QtCore.QPointF(408, 517))
+        self.body_map = BodyMap(load_label_map(), icon("cross"))
+        self.body_map.clicked.connect(self.update_body_state)
+        scene.addItem(self.body_map)
 
         return image_view
 
-    def add_button(self, scene, button, position):
-        proxy = QGraphicsProxyWidget()
-        proxy.setWidget(button)
-        proxy.setPos(position)
-        scene.addItem(proxy)
-
     def switch_language(self, lg):
         self.language = lg
-        with open(resource_path('data\\texts\\lg.txt'), 'w') as f:
-            f.write(lg)
+        write_language(lg)
         for key, value in self.translatable.items():
             value.setText(self.texts[lg][key])
         
-        text = "" if self.answer["organs"] == [] else self.texts[self.language]["body_36"] + " ".join([f"{self.texts[self.language][org]}," for org in self.answer["organs"]])[:-1]
         try:
-            self.translatable["body_36"].setText(text)
+            self.translatable["body_36"].setText(self.selected_organs_text())
         except:
             pass
 
@@ -843,13 +700,13 @@ class ReportFormApp:
         if state == QtCore.Qt.Checked:
             for checkbox in other_checkboxes:
                 checkbox.setChecked(False)
-            self.answer["category"] = name
+            self.report.category = name
 
     def update_report_state(self, state, name, other_checkboxes):
         if state == QtCore.Qt.Checked:
             for checkbox in other_checkboxes:
                 checkbox.setChecked(False)
-            self.answer["report type"] = name
+            self.report.report_type = name
 
     def update_date_input(self, date):
         
@@ -865,121 +722,54 @@ class ReportFormApp:
             if current_checkbox.text()[:2] == "30":
                 self.situation_input.setEnabled(True)
                 self.situation_input.setCursor(QtCore.Qt.IBeamCursor)
-                self.situation_input.setStyleSheet(
-                    f"border: 2px solid {self.accent_color};"
-                    "border-radius: 5px;"
-                    "padding-left: 5px;"
-                    "padding-right: 5px;"
-                    "background-color: white;"
-                    "margin-right: 35px;"
-                    "font-size: 15px;"
-                )
             else:
-                self.answer["situation"].append(name)
+                self.report.situation |= selection_bit(name)
         else:
             if current_checkbox.text()[:2] == "30":
                 self.situation_input.setEnabled(False)
                 self.situation_input.setText('')
-                self.situation_input.setStyleSheet(
-                    "border: none;"
-                    "background-color: transparent;"
-                )
             else:
-                self.answer["situation"].remove(name)
+                self.report.situation &= ~selection_bit(name)
 
     def update_injury_state(self, state, name, current_checkbox, other_checkboxes):
         if state == QtCore.Qt.Checked:
             for checkbox in other_checkboxes:
                 checkbox.setChecked(False)
             text = current_checkbox.text()
-            self.answer["injury"] = name
+            self.report.injury = name
 
-            if text != self.texts[self.language]["injury_1"]:
-                if not self.display_body:
-                    self.display_body = True
-                    self.body_layout, self.body_image = self.create_body_layout()
-                    self.harm_layout.insertLayout(1, self.body_layout, stretch=1)
-            else:
-                self.display_body = False
-                try:
-                    for i in reversed(range(self.body_layout.count())):
-                        widget_item = self.body_layout.itemAt(i)
-                        if widget_item.widget():
-                            widget_item.widget().hide()
-                    self.harm_layout.removeItem(self.body_layout)
-                except:
-                    pass
-
-    def update_body_state(self, name, button):
-        if name in self.answer["organs"]:
-            self.answer["organs"].remove(name)
-            if self.answer["organs"] == []:
-                self.translatable["body_37"].setEnabled(False)
-                self.translatable["body_37"].setStyleSheet(
-                    "border: 2px solid grey;"
-                    "border-radius: 5px;"
-                    "background: grey;"
-                    "padding-top: 5px;"
-                    "padding-bottom: 5px;"
-                    "color: white;"
-                    "margin-top: 0px;"
-                    "margin-bottom: 0px;"
-                    "font-size: 16px;"
-                )
-        else:
-            self.answer["organs"].append(name)
-            if len(self.answer["organs"]) == 1:
-                self.translatable["body_37"].setEnabled(True)
-                self.translatable["body_37"].setStyleSheet(
-                    f"border: 2px solid {self.accent_color};"
-                    "border-radius: 5px;"
-                    f"background: {self.accent_color};"
-                    "padding-top: 5px;"
-                    "padding-bottom: 5px;"
-                    "color: white;"
-                    "margin-top: 0px;"
-                    "margin-bottom: 0px;"
-                    "font-size: 16px"
-                )
-        self.translatable["body_36"].setText(self.texts[self.language]["body_36"] + " ".join([f"{self.texts[self.language][org]}," for org in self.answer["organs"]])[:-1])
-
-        if button.activated:
-            button.activated = False
-            button.none_size = QtCore.QSize(0, 0)
-            button.setIconSize(button.none_size)
-        else:
-            button.activated = True
-            button.none_size = QtCore.QSize(13, 13)
-            button.setIconSize(button.full_size)
+            self.display_body = text != self.texts[self.language]["injury_1"]
+            if self.display_body:
+                self.create_body_panel().show()
+            elif self.body_panel is not None:
+                self.body_panel.hide()
+
+    def update_body_state(self, name):
+        bit = selection_bit(name)
+        self.report.organs ^= bit
+        self.translatable["body_37"].setEnabled(self.report.organs != 0)
+        self.translatable["body_36"].setText(self.selected_organs_text())
+        self.body_map.set_activated(name, bool(self.report.organs & bit))
+
+    def selected_organs_text(self):
+        if self.report.organs == 0:
+            return ""
+        return self.texts[self.language]["body_36"] + ", ".join(self.texts[self.language][org] for org in mask_to_names(self.report.organs, "body_"))
 
         
 
     def clear_body(self):
-        self.answer["organs"] = []
+        self.report.organs = 0
         self.translatable["body_36"].setText("")
         self.translatable["body_37"].setEnabled(False)
-        self.translatable["body_37"].setStyleSheet(
-                    "border: 2px solid grey;"
-                    "border-radius: 5px;"
-                    "background: grey;"
-                    "padding-top: 5px;"
-                    "padding-bottom: 5px;"
-                    "color: white;"
-                    "margin-top: 0px;"
-                    "margin-bottom: 0px;"
-                    "font-size: 16px;"
-                )
-        for value in self.body_buttons.values():
-            value.activated = False
-            value.none_size = QtCore.QSize(0, 0)
-            value.setIconSize(value.none_size)
+        self.body_map.clear()
         
     def add_company_logo(self):
         file_dialog = QFileDialog()
         prompt = self.texts[self.language]["attachment_3"]
         logo_path = file_dialog.getOpenFileName(self.window, prompt, "", "Tous les fichiers (*);;Images (*.jpg *.png *ico *jpeg)")[0]
         if logo_path:
-            self.answer["logo"] = logo_path
+            self.report.logo = logo_path
             self.logo_layout = QHBoxLayout()
 
             logo = QPixmap(logo_path)
@@ -990,8 +780,8 @@ class ReportFormApp:
 
             delete_logo = QPushButton()
             delete_logo.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
-            delete_logo.setStyleSheet(f"border: none; background-color:teal; padding-right:4px; padding-left:4px; padding-top:6px; padding-bottom:6px")
-            delete_logo.setIcon(QIcon(resource_path("data\\images\\close.png")))
+            delete_logo.setObjectName("delete_logo")
+            delete_logo.setIcon(icon("close"))
             delete_logo.setIconSize(QtCore.QSize(20, 20))
             delete_logo.clicked.connect(self.remove_logo)
             self.logo_layout.addWidget(delete_logo, alignment=QtCore.Qt.AlignTop | QtCore.Qt.AlignRight)
@@ -1003,7 +793,7 @@ class ReportFormApp:
             self.attachment_button_layout.itemAt(0).widget().hide()
 
     def remove_logo(self):
-        self.answer["logo"] = ""
+        self.report.logo = ""
         for i in reversed(range(self.logo_layout.count())):
             widget_item = self.logo_layout.itemAt(i)
             if widget_item.widget():
@@ -1028,42 +818,28 @@ class ReportFormApp:
 
                 self.attachment_layout.insertLayout(1, self.selected_files)
 
-            self.answer["attachment"].append(path)
+            self.report.attachment.append(path)
             if len(path.split('/')) > 1:
                 name = path.split('/')[-1]
             else:
                 name = path.split('/')[-1]
 
             button = QPushButton(name)
-            button.setStyleSheet("""
-                                 border: 2px solid black;
-                                 border-radius:10px;
-                                 padding:5px;
-                                 font-size: 16px;
-                                 """)
+            button.setObjectName("attachment")
             button.setCursor(QCursor(QtCore.Qt.CursorShape.PointingHandCursor))
             button.clicked.connect(lambda _, path = path, button = button: self.remove_attachment(path, button))
             self.selected_files.insertWidget(1, button, alignment=QtCore.Qt.AlignLeft, stretch=0)
 
     def remove_attachment(self, path, widget):
-        self.answer["attachment"].remove(path)
+        self.report.attachment.remove(path)
         widget.hide()
         self.selected_files.removeWidget(widget)
         
 
     def export(self):
-        self.answer["people"] = self.people_box.text()
-        for key, value in self.info_boxes.items():
-            self.answer[key] = value.text()
-        if self.situation_input.text() != "":
-            self.answer["situation"].append(self.situation_input.text())
-        self.answer["description"] = self.description_box.toPlainText().replace('\u200e', '')
-        self.answer["comments"] = self.comment_box.toPlainText()
-
-
         file_dialog = QFileDialog()
 
-        default_filename = self.texts[self.language]['title']+'_'+ "-".join(self.answer['date'].split('/')) + ".pdf"
+        default_filename = self.texts[self.language]['title']+'_'+ "-".join(self.report.date.split('/')) + ".pdf"
         initial_dir = str(Path.home())
         file_path, _ = file_dialog.getSaveFileName(self.window,
                                                    self.texts[self.language]["ex_prompt"],
@@ -1074,348 +850,55 @@ class ReportFormApp:
         if file_path:
             folder_path = os.path.dirname(file_path)  # Folder path
             filename = os.path.basename(file_path)    # Chosen name for the file
-            self.answer["save"] = folder_path
-            self.answer['name'] = filename
-            print(self.answer)
-            if self.display_body:
-                for value in self.body_buttons.values():
-                    if value.activated:
-                        value.setIconSize(QtCore.QSize(20, 20))
-                pixmap = QPixmap(self.body_image.size())
-                painter = QPainter(pixmap)
-                painter.fillRect(pixmap.rect(), QtCore.Qt.white)
-                self.body_image.render(painter)
-                painter.end()
-                pixmap.save(resource_path('data\\images\\body_capture.png'))
-                for value in self.body_buttons.values():
-                    if value.activated:
-                        value.setIconSize(value.none_size)
-
-            for key in ('category', 'report type', 'injury'):
-                if self.answer[key] == '':
-                    self.answer[key] = 'None'
-
-            pdf = PDFGenerator(self.answer, self.texts, self.language)
-            print('done')
-
-class PDFGenerator:
-    def __init__(self, answer, texts, language) -> None:
-        self.answer, self.texts, self.language = answer, texts, language
-        self.full_box = Image(resource_path("data\\images\\box.png"), 12, 12)
-        self.empty_box = Image(resource_path("data\\images\\empty_box.png"), 12, 12)
-
-        # Different styles
-        self.title_style = ParagraphStyle(
-            "TitleStyle",
-            fontSize=18,
-            alignment=TA_CENTER,  # Align center
-            leading=20  # Line height
-        )
-        self.subtitle_style = ParagraphStyle(
-            "SubtitleStyle",
-            fontSize=10,
-            underline=True,
-            underLineColor=colors.black,
-            alignment=TA_CENTER,
-            leading=10
-        )
-        self.base_style = ParagraphStyle(
-            "BaseStyle",
-            fontSize=10,
-            alignment = TA_JUSTIFY,
-            leading = 11,
-            underLineColor=colors.black,
-        )
-        self.checkbox_style = ParagraphStyle(
-            "Checkbox",
-            fontSize=15,
-            leading=15,
-            alignment=TA_CENTER,
-            borderColor=colors.black,
-            borderWidth=1,
-            borderRadius=2,
-            borderPadding=0
-        )
-        self.create_pdf()
-
-    def create_pdf(self):
-        self.doc = SimpleDocTemplate(self.answer['save']+"/"+self.answer['name'],
-                                pagesize=A4,
-                                leftMargin=20,
-                                rightMargin=20,
-                                topMargin=20,
-                                bottomMargin=20)
-        self.quarter, self.half = self.doc.width/4, self.doc.width/2
-        self.story = []
-
-        total_pages = 2 if self.answer['attachment'] != [] else 1
-
-        self.story.append(self.create_header())
-        self.story.append(Spacer(1, 10))
-        self.story.append(self.create_row1())
-        self.story.append(self.create_situation())
-        self.story.append(self.create_description())
-        if self.answer['injury'] in ('injury_1', 'None'):
-            self.story.append(self.create_injury_body_comment())
-        else: self.story.append(self.create_injury_body_comment(2))
-
-        if total_pages == 2:
-            for pict in self.answer['attachment']:
-                try:
-                    i = img.open(pict)
-                    w, h = i.size
-                    w, h = self.doc.width, h*(self.doc.width/w)
-                    if h>self.doc.height:
-                        w, h = i.size
-                        w, h = w*(self.doc.height/h), self.doc.height
-                    self.story.append(Image(pict, w, h))
-                    self.story.append(Spacer(0, 10))
-                except:
-                    self.story.append(Paragraph(pict.split('\\')[-1], self.subtitle_style))
-                    self.story.append(Spacer(0, 10))
-            
-            self.story.pop()
-        
-        self.doc.build(self.story)
-
-    def create_header(self):
-        # Header
-        if self.answer['logo'] == '': logo_path = resource_path('data\\images\\blank.png')
-        else: logo_path = self.answer['logo']
-        logo = img.open(logo_path)
-        logo_w, logo_h = logo.size
-        desired_max_size = 50
-        if max(logo_w, logo_h) == logo_w:
-            logo_h, logo_w = logo_h * (desired_max_size / logo_w), desired_max_size
-        else:
-            logo_w, logo_h = logo_w * (desired_max_size / logo_h), desired_max_size
+            self.report.save = folder_path
+            self.report.name = filename
+            # The worker gets its own copy, the form can be edited while the PDF is built
+            answer = normalize_answer(report_to_answer(self.report))
+            print(answer)
+            self.start_export(answer)
+
+    def start_export(self, answer):
+        self.export_button.setEnabled(False)
+        self.export_worker = ExportWorker(answer, self.texts, self.language)
+
+        self.progress_dialog = QProgressDialog(self.texts[self.language]["ex_progress"], self.texts[self.language]["ex_cancel"], 0, self.export_worker.steps, self.window)
+        self.progress_dialog.setWindowTitle(self.texts[self.language]["export"])
+        # Only the export button is disabled, the form stays usable while the PDF is built
+        self.progress_dialog.setWindowModality(QtCore.Qt.NonModal)
+        self.progress_dialog.setMinimumDuration(500)
+        self.progress_dialog.setValue(0)
+        self.progress_dialog.canceled.connect(self.export_worker.cancel)
+
+        self.export_worker.signals.progress.connect(lambda stage, step, steps: self.progress_dialog.setValue(step - 1))
+        self.export_worker.signals.finished.connect(self.export_finished)
+        self.export_worker.signals.failed.connect(self.export_failed)
+        self.export_worker.signals.cancelled.connect(self.export_ended)
+        QtCore.QThreadPool.globalInstance().start(self.export_worker)
+
+    def export_ended(self):
+        self.progress_dialog.reset()
+        self.export_button.setEnabled(True)
+        self.export_worker = None
+
+    def export_finished(self, path):
+        answer, language = self.export_worker.answer, self.export_worker.language
+        self.export_ended()
+        self.store_report(answer, language, path)
+        print('done')
+
+    def store_report(self, answer, language, path):
+        # Written by the thread of the store, the form goes on at once
+        if self.store is None:
+            from store import ReportStore
+            self.store = ReportStore()
+            self.app.aboutToQuit.connect(self.store.close)
+        self.store.add(answer, language, path)
+
+    def export_failed(self, error):
+        self.export_ended()
+        QMessageBox.warning(self.window, self.texts[self.language]["export"], self.texts[self.language]["ex_error"] + "\n" + error)
 
-        
-        header_table_data = [
-            [Image(logo_path, width=logo_w, height=logo_h), Paragraph(self.texts[self.language]['pdf_title'], style=self.title_style), Paragraph(f"", self.title_style)]
-        ]
-        
-        header_table = Table(header_table_data, colWidths=[50, self.doc.width-100, 50], rowHeights=[50])
-        
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
-        ]))
-
-        return header_table
-    
-    def create_row1(self):
 
-        titles = [[
-            Paragraph("<u>"+self.texts[self.language]['category_0']+"</u>", style=self.subtitle_style),
-            Paragraph("<u>"+self.texts[self.language]['report_0']+"</u>", self.subtitle_style)
-            ]]
-        
-        titles_table = Table(titles, colWidths=[self.quarter-30, self.quarter+44], rowHeights=[13])
-        
-        titles_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER')
-        ]))
-        
-
-        checkboxes = [
-            ["", ""],
-            [],
-            [],
-            ["", ""]
-        ]
-
-        for i in range(1, 3):
-            checkboxes[i].append(self.full_box if self.answer['category'][-1] == str(i) else self.empty_box)
-            checkboxes[i].append(Paragraph(self.texts[self.language][f'category_{i}'], self.base_style))
-        
-        for i in range(1, 5):
-            checkboxes[i-1].append(self.full_box if self.answer['report type'][-1] == str(i) else self.empty_box)
-            checkboxes[i-1].append(Paragraph(self.texts[self.language][f'report_{i}'], self.base_style))
-
-        checkboxes_table = Table(checkboxes, colWidths=[15, self.quarter-45, 15, self.quarter+29])
-
-        checkboxes_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT')
-
-        ]))
-
-        people_data= [
-            [Paragraph("<u>"+self.texts[self.language]['people']+"</u>", self.subtitle_style)],
-            [Paragraph(self.answer['people'], self.base_style)]
-        ]
-        people_table = Table(people_data, colWidths=self.half+14)
-
-        info_data = [
-            [Paragraph("<u>"+self.texts[self.language]['date']+"</u>", self.subtitle_style), Paragraph(self.answer['date'], self.base_style)],
-            [Paragraph("<u>"+self.texts[self.language]['hour']+"</u>", self.subtitle_style), Paragraph(self.answer['hour'], self.base_style)],
-            [Paragraph("<u>"+self.texts[self.language]['place']+"</u>", self.subtitle_style), Paragraph(self.answer['place'], self.base_style)]
-        ]
-        info_table = Table(info_data, colWidths=[self.quarter+5, self.quarter-19], rowHeights=[30.35 for _ in range(3)])
-
-        info_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-
-        ]))
-
-        equipment_data= [
-            [Paragraph("<u>"+self.texts[self.language]['equipment']+"</u>", self.subtitle_style)],
-            [Paragraph(self.answer['equipment'], self.base_style)]
-        ]
-        equipment_table = Table(equipment_data, colWidths=self.half-14)
-
-        column1_data = [
-            [titles_table],
-            [checkboxes_table],
-            [people_table]
-        ]
-        column1_table = Table(column1_data, colWidths=[self.half+14])
-
-        column1_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('LINEABOVE', (-1, -1), (-1, -1), 1, colors.black)
-
-        ]))
-
-        column2_data = [
-            [info_table],
-            [equipment_table]
-        ]
-        column2_table = Table(column2_data, colWidths=[self.half-14])
-
-        column2_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('LINEABOVE', (-1, -1), (-1, -1), 1, colors.black)
-        ]))
-
-        row1_data = [
-            [column1_table, column2_table]
-        ]
-        row1_table = Table(row1_data, colWidths=(self.half+14, self.half-14))
-
-        row1_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
-        ]))
-
-        return row1_table
-    
-    def create_situation(self):
-        checkboxes_data = []
-        resp = []
-        for sit in self.answer["situation"]:
-            if sit in self.texts[self.language].keys():
-                resp.append(int(sit.split('_')[1]))
-            else: resp.append(30); text = ' '+sit
-
-        for i in range(1, 31):
-            if i<=15:
-                checkboxes_data.append([])
-                y = i-1
-            else: y=i-16
-            if i in resp:
-                checkboxes_data[y].append(self.full_box)
-                if i == 30:
-                    checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}']+text, self.base_style))
-                else:
-                    checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}'], self.base_style))
-            else:
-                checkboxes_data[y].append(self.empty_box)
-                checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}'], self.base_style))
-
-        checkboxes_table = Table(checkboxes_data, colWidths=[15, self.half-15, 15, self.half-15])
-        checkboxes_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('TOPPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (0, -1), 3),
-            ('TOPPADDING', (2, 0), (2, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-        ]))
-
-        situation_table = Table([[Paragraph('<u>'+self.texts[self.language]['situation_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=self.doc.width)
-        situation_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
-        ]))
-
-        return situation_table
-    
-    def create_description(self):
-        """description_table = Table(
-            [[Paragraph('<u>'+self.texts[self.language]['description']+'</u>', self.subtitle_style)],
-            [Paragraph(self.answer['description'], self.base_style)]],
-            colWidths=[self.doc.width])"""
-        description_table = Table(
-            [[Paragraph('<u>'+self.texts[self.language]['description']+'</u> '+self.answer['description'], self.base_style)]],
-            colWidths=[self.doc.width])
-        
-        description_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
-            ('BOTTOMPADDING', (0,0), (-1, -1), 6)
-        ]))
-        return description_table
-    
-    def create_injury_body_comment(self, width=1):
-        checkboxes_data = [[], [], [], []]
-        for i in range(1, 5):
-            checkboxes_data[i-1].append(self.full_box if self.answer['injury'][-1] == str(i) else self.empty_box)
-            checkboxes_data[i-1].append(Paragraph(self.texts[self.language][f'injury_{i}']))
-
-        checkboxes_table = Table(checkboxes_data, colWidths=[15, self.half-55])
-
-        if width == 1:
-            injury_table = Table([[Paragraph('<u>'+self.texts[self.language]['injury_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=[self.half-70])
-            main_table = Table([[injury_table, Paragraph('<u>'+self.texts[self.language]['injury_5']+'</u> '+self.answer['comments'], self.base_style)]], colWidths=[self.half-70, self.half+70])
-            main_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
-            ('VALIGN', (-1, -1), (-1, -1), 'TOP'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
-             ]))
-            return main_table
-        
-        else:            
-            injury_table = Table([[Paragraph('<u>'+self.texts[self.language]['injury_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=[(self.half+self.quarter)/2-5])
-            organs_table = Table([[Paragraph('<u>'+self.texts[self.language]['pdf_body']+'</u>', self.subtitle_style)], [Paragraph(", ".join([self.texts[self.language][organ] for organ in self.answer['organs']]), self.base_style)]], colWidths=[(self.quarter+self.half)/2-5])
-            row1_table = Table([[injury_table, organs_table]], colWidths=[(self.half+self.quarter)/2-5 for _ in range(2)])
-            row1_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('BOTTOMPADDING', (0,0), (-1, -1), 0),
-                ('TOPPADDING', (0,0), (-1, -1), 0),
-            ]))
-            text_table = Table([[row1_table], [Paragraph('<u>'+self.texts[self.language]['injury_5']+'</u> '+self.answer['comments'], self.base_style)]], colWidths=(self.half+self.quarter-10))
-            text_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black), # Outer border
-                ('BOTTOMPADDING', (0,0), (-1, -1), 6)
-            ]))
-            main_table = Table([[text_table, Image(resource_path("data\\images\\body_capture.png"), width=self.quarter, height=730*(self.quarter/505))]], colWidths=[self.half+self.quarter-10, self.quarter+10])
-            main_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black), # Outer border
-                ('BOTTOMPADDING', (0,0), (-1, -1), 6)
-            ]))
-            return main_table
-
-        
 
 if __name__ == '__main__':
     app_instance = ReportFormApp()
@@ -0,0 +1,201 @@
+'''
+    Body heat map of the stored reports
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python heatmap.py [--output heatmap.png | summary.pdf] [--database FILE]
+                             [--language fr] [--from 2024-01-01] [--to 2024-12-31]
+                             [--category category_1] [--report-type report_2]
+                             [--injury injury_2] [--place TEXT] [--situation situation_12]
+
+    Counts how often every body part was selected over the reports of the
+    database (store.py) and colours the regions of data/images/body.png
+    from the least to the most injured one. The regions are the ones of the
+    label map the form picks the body parts with. The selections are read
+    as the organs bitmask column into a NumPy array, and both the counting
+    and the colouring are array operations, so most of the time taken by a
+    million reports is reading them from the database.
+'''
+
+import argparse
+import sys
+from io import BytesIO
+from operator import itemgetter
+import numpy as np
+from body_regions import BODY_LABELS
+from report import BODY_COUNT, SITUATION_COUNT
+from resources import resource_bytes
+
+BODY_PICTURE = "data\\images\\body.png"
+
+# Colour of the body parts from the least (0) to the most (1) injured one, the others stay grey
+RAMP = ((0.0, (255, 237, 160)), (0.5, (253, 141, 60)), (1.0, (189, 0, 38)))
+# Opacity of the colour over the picture, so that its shading still shows
+HEAT_ALPHA = 0.8
+LEGEND_HEIGHT = 40
+
+
+def stored_masks(connection, **criteria):
+    # Organs bitmask of every report matching criteria (see store.find_reports), 0 for the reports without injury
+    from store import report_filter, where
+    clauses, params = report_filter(**criteria)
+    cursor = connection.cursor()
+    cursor.row_factory = None
+    cursor.execute(f"SELECT CASE WHEN injury IS NOT NULL AND injury != 'injury_1' THEN organs ELSE 0 END"
+                   f" FROM report{where(clauses)}", params)
+    return np.fromiter(map(itemgetter(0), cursor), dtype=np.int64)
+
+def organ_counts(masks, count=BODY_COUNT):
+    """Number of reports selecting every body part, indexed by body part number (counts[7] for
+    body_7, counts[0] is unused) like the label map."""
+    masks = np.asarray(masks, dtype=np.int64).view(np.uint64)
+    counts = np.zeros(count + 1, dtype=np.int64)
+    for number in range(1, count + 1):
+        counts[number] = np.count_nonzero(masks & np.uint64(1 << (number - 1)))
+    return counts
+
+def ramp_colours(levels, ramp=RAMP):
+    # RGB colour of every level between 0 and 1
+    positions = [position for position, _ in ramp]
+    return np.stack([np.interp(levels, positions, [colour[channel] for _, colour in ramp]) for channel in range(3)],
+                    axis=-1).round().astype(np.uint8)
+
+def heat_picture(counts, legend=True):
+    from PIL import Image, ImageDraw
+    body = Image.open(BytesIO(resource_bytes(BODY_PICTURE))).convert("RGBA")
+    labels = np.asarray(Image.open(BytesIO(resource_bytes(BODY_LABELS))).convert("L"))
+    pixels = np.asarray(body).astype(np.float32)
+
+    # The blue picture turned grey, keeping its shading
+    grey = pixels[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    grey = 90 + grey * (165 / max(float(grey.max()), 1))
+    result = np.repeat(grey[..., None], 3, axis=-1)
+
+    # Colour and opacity of every label, looked up for every pixel at once
+    counts = np.asarray(counts)
+    top = counts[1:].max() if len(counts) > 1 else 0
+    levels = counts / top if top else np.zeros(len(counts))
+    colours = np.zeros((256, 3), dtype=np.float32)
+    colours[:len(counts)] = ramp_colours(levels)
+    opacity = np.zeros(256, dtype=np.float32)
+    opacity[1:len(counts)] = np.where(counts[1:] > 0, HEAT_ALPHA, 0)
+    alpha = opacity[labels][..., None]
+    result = result * (1 - alpha) + colours[labels] * alpha
+
+    picture = Image.fromarray(np.dstack([result, pixels[..., 3]]).round().astype(np.uint8), "RGBA")
+    if not legend:
+        return picture
+    # Colour ramp from 0 to the highest count, under the picture
+    framed = Image.new("RGBA", (picture.width, picture.height + LEGEND_HEIGHT), (255, 255, 255, 0))
+    framed.paste(picture, (0, 0))
+    left, right, top_edge = 40, picture.width - 40, picture.height + 8
+    ramp = ramp_colours(np.linspace(0, 1, right - left))
+    framed.paste(Image.fromarray(np.repeat(ramp[None], 12, axis=0), "RGB"), (left, top_edge))
+    draw = ImageDraw.Draw(framed)
+    draw.text((left - 6, top_edge), "0", fill="black", anchor="ra")
+    draw.text((right + 6, top_edge), str(int(top)), fill="black", anchor="la")
+    return framed
+
+def picture_bytes(picture):
+    output = BytesIO()
+    picture.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def summary_pdf(counts, reports, texts, language, output, period=None):
+    """One page : the heat map, the number of reports, and the body parts from the most injured one.
+    output is a file name or a binary file object."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Spacer, Table, TableStyle, Image, Paragraph
+    from reportlab.lib import colors
+    from pdf_generator import warm_up
+    shared = warm_up()
+    base_style = shared["base_style"]
+    lg = texts[language]
+
+    document = SimpleDocTemplate(output, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
+    story = [Paragraph(lg["heat_title"], shared["title_style"]), Spacer(1, 20)]
+    lines = []
+    if period:
+        lines.append([Paragraph(f"<u>{lg['heat_period']}</u> {period}", base_style)])
+    lines.append([Paragraph(f"<u>{lg['heat_reports']}</u> {reports}", base_style)])
+    lines.append([Paragraph(f"<u>{lg['heat_injuries']}</u> {int(counts[1:].sum())}", base_style)])
+    story += [Table(lines, colWidths=[document.width]), Spacer(1, 10)]
+
+    width = document.width / 2
+    picture = heat_picture(counts)
+    image = Image(BytesIO(picture_bytes(picture)), width, width * picture.height / picture.width)
+    rows = [[Paragraph(f"<b>{lg['pdf_body'].rstrip(' :')}</b>", base_style), Paragraph(f"<b>{lg['heat_count']}</b>", base_style)]]
+    for number in np.argsort(-counts[1:], kind="stable") + 1:
+        if counts[number]:
+            rows.append([Paragraph(lg[f"body_{number}"], base_style), str(counts[number])])
+    parts = Table(rows, colWidths=[width - 70, 50], repeatRows=1)
+    parts.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+    ]))
+    layout = Table([[image, parts]], colWidths=[width, width])
+    layout.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP')]))
+    story.append(layout)
+    document.build(story)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Body heat map of the stored reports.")
+    parser.add_argument("-o", "--output", default="heatmap.png", help="PNG picture or PDF summary, by extension")
+    parser.add_argument("-d", "--database", help="database file, the one of the form by default")
+    from translations import available_languages
+    parser.add_argument("-l", "--language", choices=available_languages(),
+                        help="language of the PDF summary, the one of the form by default")
+    parser.add_argument("--from", dest="date_from", help="first date, yyyy-mm-dd")
+    parser.add_argument("--to", dest="date_to", help="last date, yyyy-mm-dd")
+    for option in ("category", "report-type", "injury", "place"):
+        parser.add_argument(f"--{option}")
+    parser.add_argument("--situation", metavar="situation_N",
+                        choices=[f"situation_{n}" for n in range(1, SITUATION_COUNT + 1)])
+    args = parser.parse_args(argv)
+
+    from store import connect, StoreError
+    import sqlite3
+    try:
+        connection = connect(args.database, readonly=True)
+    except (sqlite3.Error, OSError, StoreError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    masks = stored_masks(connection, date_from=args.date_from, date_to=args.date_to, category=args.category,
+                         report_type=args.report_type, injury=args.injury, place=args.place, situation=args.situation)
+    counts = organ_counts(masks)
+    if args.output.lower().endswith(".pdf"):
+        from translations import read_language, load_texts, TranslationError
+        language = args.language or read_language()
+        try:
+            texts = load_texts((language,))
+        except KeyError:
+            print(f"no texts for the language {language!r}", file=sys.stderr)
+            return 1
+        except TranslationError as error:
+            print(error, file=sys.stderr)
+            return 1
+        period = " - ".join(date for date in (args.date_from, args.date_to) if date) or None
+        summary_pdf(counts, len(masks), texts, language, args.output, period)
+    else:
+        with open(args.output, 'wb') as f:
+            f.write(picture_bytes(heat_picture(counts)))
+    print(args.output, f"{len(masks)} report(s)", f"{int(counts.sum())} injured part(s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+'''
+    Preparation of the pictures embedded in the PDF
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.'''
+
+
+
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from PIL import Image as img, ImageOps
+
+
+# Resolution of the attachments at their printed size, and quality of the re-encoded photos
+ATTACHMENT_DPI = 150
+JPEG_QUALITY = 80
+
+ORIENTATION = 0x0112
+
+# The cache of prepared pictures is kept under this size, in bytes
+CACHE_SIZE = 200*1024*1024
+
+def cache_folder():
+    # Outside of the installation folder, which is read-only once packaged
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return os.path.join(base, 'AccidentReportForm', 'images')
+
+
+class ImageCache:
+    """Prepared pictures stored on disk, keyed by the content of the source file and the
+    size they are prepared for. Once the folder is bigger than max_size, the least recently
+    used entries are removed. Several processes can share the same folder."""
+
+    def __init__(self, folder=None, max_size=CACHE_SIZE):
+        self.folder = folder or cache_folder()
+        self.max_size = max_size
+        os.makedirs(self.folder, exist_ok=True)
+        # Content hash of the files already read by this process, by (path, mtime, size)
+        self.hashes = {}
+        # Size of the folder, read on the first put() and then counted, the other processes may add to it
+        self.size = None
+
+    def key(self, path, *params):
+        stat = os.stat(path)
+        file_id = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if file_id not in self.hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024*1024), b''):
+                    digest.update(block)
+            self.hashes[file_id] = digest.hexdigest()
+        return self.hashes[file_id] + '_' + '_'.join(str(p) for p in params)
+
+    def get(self, key):
+        entry = os.path.join(self.folder, key)
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(entry)     # The modification time tells the last use
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        # The cache is only an optimization, a full disk or a read-only folder doesn't fail the report
+        temp = None
+        try:
+            if self.size is None:
+                self.size = self.folder_size()
+            fd, temp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp, os.path.join(self.folder, key))
+            temp = None
+            self.size += len(data)
+            if self.size > self.max_size:
+                self.evict()
+        except OSError:
+            if temp is not None:
+                try:
+                    os.remove(temp)
+                except OSError:
+                    pass
+
+    def entries(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def folder_size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        try:
+            entries = self.entries()
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.size = total
+
+_default_cache = []
+
+def default_cache():
+    if not _default_cache:
+        try:
+            _default_cache.append(ImageCache())
+        except OSError:
+            # No writable cache folder, the pictures are prepared on every export
+            _default_cache.append(None)
+    return _default_cache[0]
+
+def oriented_size(picture):
+    # Size of the picture once the EXIF orientation is applied, without decoding it
+    w, h = picture.size
+    if picture.getexif().get(ORIENTATION, 1) in (5, 6, 7, 8):
+        return h, w
+    return w, h
+
+def fit_size(size, max_width, max_height):
+    # Biggest size keeping the proportions: the full width, or the full height for taller pictures
+    w, h = size
+    w, h = max_width, h*(max_width/w)
+    if h>max_height:
+        w, h = size
+        w, h = w*(max_height/h), max_height
+    return w, h
+
+def downsample(picture, width, height, dpi=ATTACHMENT_DPI, quality=JPEG_QUALITY):
+    """Returns the picture as a file object, with just enough pixels to be printed at
+    dpi on width x height points. Photos are re-encoded as JPEG, other pictures as PNG."""
+    target = (max(1, round(width/72*dpi)), max(1, round(height/72*dpi)))
+    photo = picture.format in ('JPEG', 'MPO')
+    if photo:
+        # Let the JPEG decoder skip the pixels we would throw away anyway
+        rotated = picture.getexif().get(ORIENTATION, 1) in (5, 6, 7, 8)
+        picture.draft('RGB', target[::-1] if rotated else target)
+    picture = ImageOps.exif_transpose(picture)
+    if picture.width > target[0] or picture.height > target[1]:
+        picture = picture.resize(target, img.LANCZOS)
+
+    data = BytesIO()
+    if photo or picture.mode == 'CMYK':
+        picture.convert('RGB').save(data, 'JPEG', quality=quality, optimize=True)
+    else:
+        if picture.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+            picture = picture.convert('RGBA')
+        picture.save(data, 'PNG', optimize=True)
+    data.seek(0)
+    return data
+
+def prepare_picture(path, max_width, max_height, dpi=ATTACHMENT_DPI, quality=JPEG_QUALITY, cache=None, stats=None):
+    """Returns (source, width, height) to build a platypus.Image fitting in max_width x max_height.
+    Small JPEG files which don't need to be turned are embedded as they are, the other
+    pictures go through downsample and are kept in the cache if one is given.
+    stats (pdf_generator.ReportStats) counts the pictures of each kind."""
+    if cache is not None:
+        key = cache.key(path, round(max_width), round(max_height), dpi, quality)
+        data = cache.get(key)
+        if data is not None:
+            data = BytesIO(data)
+            # The prepared picture keeps the proportions of the source
+            w, h = fit_size(img.open(data).size, max_width, max_height)
+            data.seek(0)
+            if stats is not None:
+                stats.count('pictures_from_cache')
+            return data, w, h
+
+    picture = img.open(path)
+    w, h = fit_size(oriented_size(picture), max_width, max_height)
+    upright = picture.getexif().get(ORIENTATION, 1) == 1
+    if picture.format == 'JPEG' and upright and picture.width <= w/72*dpi and picture.height <= h/72*dpi:
+        if stats is not None:
+            stats.count('pictures_as_is')
+        return path, w, h
+    data = downsample(picture, w, h, dpi, quality)
+    if stats is not None:
+        stats.count('pictures_decoded')
+    if cache is not None:
+        cache.put(key, data.getvalue())
+    return data, w, h
@@ -0,0 +1,505 @@
+'''
+    PDF rendering of a report, usable without Qt
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Spacer, Table, TableStyle, Image, Paragraph, Flowable
+from reportlab.lib.utils import ImageReader
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from PIL import Image as img
+import json
+import logging
+import time
+from io import BytesIO
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from body_regions import BODY_IMAGE_SIZE, BODY_VIEW_SIZE, region_center
+from assets import asset_path, asset_bytes
+from images import ATTACHMENT_DPI, JPEG_QUALITY, prepare_picture, default_cache
+from report import names_to_mask, selection_bit, SITUATION_COUNT
+
+
+class ReaderImage(Flowable):
+    # platypus.Image only takes file names and file objects, this draws any ImageReader
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader, self.width, self.height = reader, width, height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height)
+
+# Resolution of the body picture embedded under the vector marks
+BODY_DPI = 150
+
+@lru_cache(maxsize=None)
+def body_outline(pixel_width):
+    # body.png flattened on white and resized to its printed size, kept as a small JPEG shared by every report
+    body = img.open(BytesIO(asset_bytes("body"))).convert('RGBA')
+    flat = img.new('RGBA', body.size, 'white')
+    flat.alpha_composite(body)
+    pixel_height = round(pixel_width * BODY_IMAGE_SIZE[1] / BODY_IMAGE_SIZE[0])
+    flat = flat.convert('RGB').resize((pixel_width, pixel_height), img.LANCZOS)
+    data = BytesIO()
+    flat.save(data, 'JPEG', quality=85)
+    data.seek(0)
+    return ImageReader(data)
+
+class BodyDiagram(Flowable):
+    # Body picture with a vector cross on every selected organ, like the crosses of the form
+    cross_color = colors.HexColor('#f44336')
+
+    def __init__(self, organs, width, height):
+        super().__init__()
+        self.organs, self.width, self.height = organs, width, height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        scale = self.width / BODY_VIEW_SIZE[0]
+        top = (BODY_VIEW_SIZE[1] - BODY_IMAGE_SIZE[1]) / 2
+        image_w, image_h = BODY_IMAGE_SIZE[0]*scale, BODY_IMAGE_SIZE[1]*scale
+        self.canv.drawImage(body_outline(round(image_w / 72 * BODY_DPI)), 0, self.height - (top*scale) - image_h, image_w, image_h)
+
+        # The cross icon is 20px wide, its strokes go from 1.2 to 18.8 and are 2.5px thick
+        arm = 8.8 * scale
+        self.canv.setStrokeColor(self.cross_color)
+        self.canv.setLineWidth(2.5 * scale)
+        self.canv.setLineCap(1)
+        for organ in self.organs:
+            if not organ.startswith('body_'):
+                continue
+            cx, cy = region_center(organ)
+            x, y = cx*scale, self.height - (cy+top)*scale
+            self.canv.line(x-arm, y-arm, x+arm, y+arm)
+            self.canv.line(x-arm, y+arm, x+arm, y-arm)
+
+# Styles and checkbox pictures are the same for every report, they are built once per process
+_shared = {}
+
+def warm_up():
+    if _shared:
+        return _shared
+    shared = {}
+    shared["full_box"] = Image(BytesIO(asset_bytes("box")), 12, 12, lazy=0)
+    shared["empty_box"] = Image(BytesIO(asset_bytes("empty_box")), 12, 12, lazy=0)
+
+    # Different styles
+    shared["title_style"] = ParagraphStyle(
+        "TitleStyle",
+        fontSize=18,
+        alignment=TA_CENTER,  # Align center
+        leading=20  # Line height
+    )
+    shared["subtitle_style"] = ParagraphStyle(
+        "SubtitleStyle",
+        fontSize=10,
+        underline=True,
+        underLineColor=colors.black,
+        alignment=TA_CENTER,
+        leading=10
+    )
+    shared["base_style"] = ParagraphStyle(
+        "BaseStyle",
+        fontSize=10,
+        alignment = TA_JUSTIFY,
+        leading = 11,
+        underLineColor=colors.black,
+    )
+    shared["checkbox_style"] = ParagraphStyle(
+        "Checkbox",
+        fontSize=15,
+        leading=15,
+        alignment=TA_CENTER,
+        borderColor=colors.black,
+        borderWidth=1,
+        borderRadius=2,
+        borderPadding=0
+    )
+    # Decode the checkbox pictures now rather than while the first report is built
+    for box in ("full_box", "empty_box"):
+        shared[box]._img.getRGBData()
+    _shared.update(shared)
+    return _shared
+
+logger = logging.getLogger(__name__)
+
+class ExportCancelled(Exception):
+    pass
+
+class ReportStats:
+    # Durations of the stages of one report, in seconds, and counters of the prepared pictures
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def as_dict(self):
+        return {"stages": self.stages, "counts": self.counts, "total": self.total}
+
+def pdf_bytes(answer, texts, language, **options):
+    # The PDF is built in memory, answer['save'] and answer['name'] are not used
+    output = BytesIO()
+    PDFGenerator(answer, texts, language, output=output, **options)
+    return output.getvalue()
+
+class PDFGenerator:
+    def __init__(self, answer, texts, language, body_capture=None, dpi=ATTACHMENT_DPI, quality=JPEG_QUALITY, image_cache=True, output=None, stats=False,
+                 progress=None, cancelled=None) -> None:
+        self.answer, self.texts, self.language = answer, texts, language
+        # Binary file object receiving the PDF, answer['save']/answer['name'] by default
+        self.output = output
+        # Attachments are downsampled to dpi at their printed size, photos re-encoded with this JPEG quality
+        self.dpi, self.quality = dpi, quality
+        # images.ImageCache of the prepared pictures, True for the default one, None to disable it
+        self.image_cache = default_cache() if image_cache is True else image_cache
+        # Raster picture of the body diagram (file path or ImageReader) used instead of BodyDiagram
+        self.body_capture = body_capture
+        # With stats=True, self.stats is a ReportStats of this report, also logged at INFO level
+        self.stats = ReportStats() if stats else None
+        # progress(stage, step, steps) is called before every stage and attachment, cancelled() is
+        # checked at the same points and while the pages are laid out, it stops with ExportCancelled
+        self.progress, self.cancelled = progress, cancelled
+        self.step, self.steps = 0, 6 + len(answer['attachment'])
+        shared = warm_up()
+        self.full_box, self.empty_box = shared['full_box'], shared['empty_box']
+        self.title_style, self.subtitle_style = shared['title_style'], shared['subtitle_style']
+        self.base_style, self.checkbox_style = shared['base_style'], shared['checkbox_style']
+        self.create_pdf()
+        if self.stats is not None:
+            logger.info("report stats %s", json.dumps(dict(self.stats.as_dict(), name=self.answer['name'])))
+
+    def advance(self, name):
+        self.check_cancelled()
+        self.step += 1
+        if self.progress is not None:
+            self.progress(name, self.step, self.steps)
+
+    def check_cancelled(self, *args):
+        if self.cancelled is not None and self.cancelled():
+            raise ExportCancelled()
+
+    def stage(self, name, advance=True):
+        if advance:
+            self.advance(name)
+        return self.stats.stage(name) if self.stats is not None else nullcontext()
+
+    def create_pdf(self):
+        self.doc = SimpleDocTemplate(self.output if self.output is not None else self.answer['save']+"/"+self.answer['name'],
+                                pagesize=A4,
+                                leftMargin=20,
+                                rightMargin=20,
+                                topMargin=20,
+                                bottomMargin=20)
+        self.quarter, self.half = self.doc.width/4, self.doc.width/2
+        self.story = []
+
+        total_pages = 2 if self.answer['attachment'] != [] else 1
+
+        with self.stage('create_header'):
+            self.story.append(self.create_header())
+        self.story.append(Spacer(1, 10))
+        with self.stage('create_row1'):
+            self.story.append(self.create_row1())
+        with self.stage('create_situation'):
+            self.story.append(self.create_situation())
+        with self.stage('create_description'):
+            self.story.append(self.create_description())
+        with self.stage('create_injury_body_comment'):
+            if self.answer['injury'] in ('injury_1', 'None'):
+                self.story.append(self.create_injury_body_comment())
+            else: self.story.append(self.create_injury_body_comment(2))
+
+        if total_pages == 2:
+            with self.stage('attachments', advance=False):
+                for pict in self.answer['attachment']:
+                    self.advance('attachment')
+                    try:
+                        source, w, h = prepare_picture(pict, self.doc.width, self.doc.height, self.dpi, self.quality, self.image_cache, self.stats)
+                        self.story.append(Image(source, w, h))
+                        self.story.append(Spacer(0, 10))
+                    except:
+                        if self.stats is not None:
+                            self.stats.count('pictures_failed')
+                        self.story.append(Paragraph(pict.split('\\')[-1], self.subtitle_style))
+                        self.story.append(Spacer(0, 10))
+            
+            self.story.pop()
+        
+        with self.stage('build'):
+            self.doc.setProgressCallBack(self.check_cancelled)
+            self.doc.build(self.story)
+
+    def create_header(self):
+        # Header
+        if self.answer['logo'] == '': logo_path = asset_path('blank')
+        else: logo_path = self.answer['logo']
+        desired_max_size = 50
+        logo, logo_w, logo_h = prepare_picture(logo_path, desired_max_size, desired_max_size, self.dpi, self.quality, self.image_cache, self.stats)
+
+        
+        header_table_data = [
+            [Image(logo, width=logo_w, height=logo_h), Paragraph(self.texts[self.language]['pdf_title'], style=self.title_style), Paragraph(f"", self.title_style)]
+        ]
+        
+        header_table = Table(header_table_data, colWidths=[50, self.doc.width-100, 50], rowHeights=[50])
+        
+        header_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
+            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
+        ]))
+
+        return header_table
+    
+    def create_row1(self):
+
+        titles = [[
+            Paragraph("<u>"+self.texts[self.language]['category_0']+"</u>", style=self.subtitle_style),
+            Paragraph("<u>"+self.texts[self.language]['report_0']+"</u>", self.subtitle_style)
+            ]]
+        
+        titles_table = Table(titles, colWidths=[self.quarter-30, self.quarter+44], rowHeights=[13])
+        
+        titles_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER')
+        ]))
+        
+
+        checkboxes = [
+            ["", ""],
+            [],
+            [],
+            ["", ""]
+        ]
+
+        for i in range(1, 3):
+            checkboxes[i].append(self.full_box if self.answer['category'][-1] == str(i) else self.empty_box)
+            checkboxes[i].append(Paragraph(self.texts[self.language][f'category_{i}'], self.base_style))
+        
+        for i in range(1, 5):
+            checkboxes[i-1].append(self.full_box if self.answer['report type'][-1] == str(i) else self.empty_box)
+            checkboxes[i-1].append(Paragraph(self.texts[self.language][f'report_{i}'], self.base_style))
+
+        checkboxes_table = Table(checkboxes, colWidths=[15, self.quarter-45, 15, self.quarter+29])
+
+        checkboxes_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT')
+
+        ]))
+
+        people_data= [
+            [Paragraph("<u>"+self.texts[self.language]['people']+"</u>", self.subtitle_style)],
+            [Paragraph(self.answer['people'], self.base_style)]
+        ]
+        people_table = Table(people_data, colWidths=self.half+14)
+
+        info_data = [
+            [Paragraph("<u>"+self.texts[self.language]['date']+"</u>", self.subtitle_style), Paragraph(self.answer['date'], self.base_style)],
+            [Paragraph("<u>"+self.texts[self.language]['hour']+"</u>", self.subtitle_style), Paragraph(self.answer['hour'], self.base_style)],
+            [Paragraph("<u>"+self.texts[self.language]['place']+"</u>", self.subtitle_style), Paragraph(self.answer['place'], self.base_style)]
+        ]
+        info_table = Table(info_data, colWidths=[self.quarter+5, self.quarter-19], rowHeights=[30.35 for _ in range(3)])
+
+        info_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+
+        ]))
+
+        equipment_data= [
+            [Paragraph("<u>"+self.texts[self.language]['equipment']+"</u>", self.subtitle_style)],
+            [Paragraph(self.answer['equipment'], self.base_style)]
+        ]
+        equipment_table = Table(equipment_data, colWidths=self.half-14)
+
+        column1_data = [
+            [titles_table],
+            [checkboxes_table],
+            [people_table]
+        ]
+        column1_table = Table(column1_data, colWidths=[self.half+14])
+
+        column1_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('LINEABOVE', (-1, -1), (-1, -1), 1, colors.black)
+
+        ]))
+
+        column2_data = [
+            [info_table],
+            [equipment_table]
+        ]
+        column2_table = Table(column2_data, colWidths=[self.half-14])
+
+        column2_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('LINEABOVE', (-1, -1), (-1, -1), 1, colors.black)
+        ]))
+
+        row1_data = [
+            [column1_table, column2_table]
+        ]
+        row1_table = Table(row1_data, colWidths=(self.half+14, self.half-14))
+
+        row1_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
+            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
+        ]))
+
+        return row1_table
+    
+    def create_situation(self):
+        checkboxes_data = []
+        checked = names_to_mask((sit for sit in self.answer["situation"] if sit in self.texts[self.language]), SITUATION_COUNT)
+        # situation_30 may come without its text
+        text = ""
+        for sit in self.answer["situation"]:
+            if sit not in self.texts[self.language]:
+                checked |= selection_bit('situation_30'); text = ' '+sit
+
+        for i in range(1, 31):
+            if i<=15:
+                checkboxes_data.append([])
+                y = i-1
+            else: y=i-16
+            if checked >> (i-1) & 1:
+                checkboxes_data[y].append(self.full_box)
+                if i == 30:
+                    checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}']+text, self.base_style))
+                else:
+                    checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}'], self.base_style))
+            else:
+                checkboxes_data[y].append(self.empty_box)
+                checkboxes_data[y].append(Paragraph(self.texts[self.language][f'situation_{i}'], self.base_style))
+
+        checkboxes_table = Table(checkboxes_data, colWidths=[15, self.half-15, 15, self.half-15])
+        checkboxes_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (0, -1), 3),
+            ('TOPPADDING', (2, 0), (2, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ]))
+
+        situation_table = Table([[Paragraph('<u>'+self.texts[self.language]['situation_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=self.doc.width)
+        situation_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
+        ]))
+
+        return situation_table
+    
+    def create_description(self):
+        """description_table = Table(
+            [[Paragraph('<u>'+self.texts[self.language]['description']+'</u>', self.subtitle_style)],
+            [Paragraph(self.answer['description'], self.base_style)]],
+            colWidths=[self.doc.width])"""
+        description_table = Table(
+            [[Paragraph('<u>'+self.texts[self.language]['description']+'</u> '+self.answer['description'], self.base_style)]],
+            colWidths=[self.doc.width])
+        
+        description_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
+            ('BOTTOMPADDING', (0,0), (-1, -1), 6)
+        ]))
+        return description_table
+    
+    def create_injury_body_comment(self, width=1):
+        checkboxes_data = [[], [], [], []]
+        for i in range(1, 5):
+            checkboxes_data[i-1].append(self.full_box if self.answer['injury'][-1] == str(i) else self.empty_box)
+            checkboxes_data[i-1].append(Paragraph(self.texts[self.language][f'injury_{i}']))
+
+        checkboxes_table = Table(checkboxes_data, colWidths=[15, self.half-55])
+
+        if width == 1:
+            injury_table = Table([[Paragraph('<u>'+self.texts[self.language]['injury_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=[self.half-70])
+            main_table = Table([[injury_table, Paragraph('<u>'+self.texts[self.language]['injury_5']+'</u> '+self.answer['comments'], self.base_style)]], colWidths=[self.half-70, self.half+70])
+            main_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
+            ('VALIGN', (-1, -1), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),  # Inner grid
+            ('BOX', (0, 0), (-1, -1), 1, colors.black),        # Outer border
+             ]))
+            return main_table
+        
+        else:            
+            injury_table = Table([[Paragraph('<u>'+self.texts[self.language]['injury_0']+'</u>', self.subtitle_style)], [checkboxes_table]], colWidths=[(self.half+self.quarter)/2-5])
+            organs_table = Table([[Paragraph('<u>'+self.texts[self.language]['pdf_body']+'</u>', self.subtitle_style)], [Paragraph(", ".join([self.texts[self.language][organ] for organ in self.answer['organs']]), self.base_style)]], colWidths=[(self.quarter+self.half)/2-5])
+            row1_table = Table([[injury_table, organs_table]], colWidths=[(self.half+self.quarter)/2-5 for _ in range(2)])
+            row1_table.setStyle(TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('BOTTOMPADDING', (0,0), (-1, -1), 0),
+                ('TOPPADDING', (0,0), (-1, -1), 0),
+            ]))
+            text_table = Table([[row1_table], [Paragraph('<u>'+self.texts[self.language]['injury_5']+'</u> '+self.answer['comments'], self.base_style)]], colWidths=(self.half+self.quarter-10))
+            text_table.setStyle(TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black), # Outer border
+                ('BOTTOMPADDING', (0,0), (-1, -1), 6)
+            ]))
+            if self.body_capture is None:
+                body_picture = BodyDiagram(self.answer['organs'], width=self.quarter, height=730*(self.quarter/505))
+            else:
+                body_picture = ReaderImage(ImageReader(self.body_capture), width=self.quarter, height=730*(self.quarter/505))
+            main_table = Table([[text_table, body_picture]], colWidths=[self.half+self.quarter-10, self.quarter+10])
+            main_table.setStyle(TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('BOX', (0, 0), (-1, -1), 1, colors.black), # Outer border
+                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black), # Outer border
+                ('BOTTOMPADDING', (0,0), (-1, -1), 6)
+            ]))
+            return main_table
+
+        
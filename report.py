@@ -0,0 +1,156 @@
+'''
+    Data of a report, as filled by the form
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    The form keeps its state in a Report, updated by the signals of the
+    widgets, and the PDF generator reads an answer dict. report_to_answer()
+    and report_from_answer() convert between the two without changing their
+    argument, so an export is a copy of a few strings and lists.
+
+    The checked situations and body parts are bitmasks, bit n-1 standing for
+    situation_n or body_n, so that a selection is a single int whatever its
+    size and set operations are integer operations. The masks are stored
+    as SQLite INTEGER and read as np.int64, so there are at most 63 of each.
+'''
+
+# Report attribute : key of the answer dict
+ANSWER_KEYS = {
+    "category": "category",
+    "report_type": "report type",
+    "date": "date",
+    "hour": "hour",
+    "place": "place",
+    "equipment": "equipment",
+    "people": "people",
+    "situation": "situation",
+    "description": "description",
+    "injury": "injury",
+    "organs": "organs",
+    "comments": "comments",
+    "logo": "logo",
+    "attachment": "attachment",
+    "save": "save",
+    "name": "name",
+}
+LIST_FIELDS = ("attachment",)
+SITUATION_COUNT = 30
+BODY_COUNT = 35
+# Signed 64 bit integers in the database and the heat map
+MASK_BITS = 63
+assert SITUATION_COUNT <= MASK_BITS and BODY_COUNT <= MASK_BITS
+# Bitmask fields, the prefix of their names in the answer and their number
+MASK_FIELDS = {"situation": ("situation_", SITUATION_COUNT), "organs": ("body_", BODY_COUNT)}
+# The last situation is "other", its text takes its place in the answer
+OTHER_SITUATION = f"situation_{SITUATION_COUNT}"
+
+# Single choice questions, 'None' in the answer when nothing is checked
+CHOICE_FIELDS = ("category", "report_type", "injury")
+
+
+def selection_number(name):
+    # "situation_12" -> 12
+    return int(name.rsplit('_', 1)[1])
+
+def selection_bit(name):
+    return 1 << (selection_number(name) - 1)
+
+def names_to_mask(names, count=MASK_BITS):
+    # ValueError for a name that is not one of the count selections of its kind, e.g. body_0 or body_36
+    mask = 0
+    for name in names:
+        try:
+            number = selection_number(name)
+        except (IndexError, ValueError):
+            number = 0
+        if not 1 <= number <= count:
+            raise ValueError(f"unknown selection {name!r}")
+        mask |= 1 << (number - 1)
+    return mask
+
+def mask_numbers(mask):
+    numbers = []
+    number = 1
+    while mask:
+        if mask & 1:
+            numbers.append(number)
+        mask >>= 1
+        number += 1
+    return numbers
+
+def mask_to_names(mask, prefix):
+    return [f"{prefix}{number}" for number in mask_numbers(mask)]
+
+def has_injury(injury):
+    # Nothing checked or "No injury" (injury_1) : the body parts are not part of the report
+    return injury not in ("", "None", "injury_1")
+
+
+class Report:
+    # The text of the "other" situation is kept apart from the checked situations
+    __slots__ = tuple(ANSWER_KEYS) + ("other_situation",)
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, [] if field in LIST_FIELDS else 0 if field in MASK_FIELDS else "")
+        for field, value in fields.items():
+            setattr(self, field, value)
+
+
+def report_to_answer(report):
+    answer = {}
+    for field, key in ANSWER_KEYS.items():
+        value = getattr(report, field)
+        if field == "organs" and not has_injury(report.injury):
+            value = 0
+        if field in MASK_FIELDS:
+            value = mask_to_names(value, MASK_FIELDS[field][0])
+        answer[key] = list(value) if field in LIST_FIELDS else value
+    if report.other_situation != "":
+        # The text stands for the "other" situation
+        answer["situation"] = [sit for sit in answer["situation"] if sit != OTHER_SITUATION] + [report.other_situation]
+    return answer
+
+def report_from_answer(answer):
+    # The keys missing from answer keep their empty value, the unknown ones are ignored
+    report = Report()
+    for field, key in ANSWER_KEYS.items():
+        if key in answer:
+            value = answer[key]
+            if field in MASK_FIELDS:
+                prefix, count = MASK_FIELDS[field]
+                value = names_to_mask((name for name in value if name.startswith(prefix)), count)
+            setattr(report, field, list(value) if field in LIST_FIELDS else value)
+    for field in CHOICE_FIELDS:
+        if getattr(report, field) == 'None':
+            setattr(report, field, "")
+    if not has_injury(report.injury):
+        report.organs = 0
+    # What is not a situation_n is the text of the "other" situation, which is then checked
+    report.other_situation = " ".join(sit for sit in answer.get("situation", ()) if not sit.startswith("situation_"))
+    if report.other_situation != "":
+        report.situation |= selection_bit(OTHER_SITUATION)
+    return report
+
+
+def empty_answer():
+    return report_to_answer(Report())
+
+def normalize_answer(answer):
+    # The single choice questions are read back with answer[key][-1], so they can't stay empty
+    for key in ('category', 'report type', 'injury'):
+        if answer[key] == '':
+            answer[key] = 'None'
+    return answer
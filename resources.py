@@ -0,0 +1,175 @@
+'''
+    Resource lookup shared by the form and the PDF generator
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python resources.py   (builds resources.bundle before packaging)
+
+    A packaged build ships its resources as a single uncompressed zip,
+    resources.bundle, instead of one loose file each, so that a onefile
+    executable extracts one file whatever the number of pictures. The bundle
+    is mapped in memory and a resource is a slice of it. A loose file, as in
+    a source checkout, is read instead of its bundled copy.
+'''
+
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+
+system = 'linux'
+
+BUNDLE = "resources.bundle"
+
+# Files read at runtime, packed into the bundle
+BUNDLED_FOLDERS = ("data\\assets",)
+BUNDLED_FILES = (
+    "icon.ico",
+    "data\\images\\body.png",
+    "data\\images\\body_regions.png",
+    "data\\texts\\lg.txt",
+)
+
+# https://stackoverflow.com/questions/31836104/pyinstaller-and-onefile-how-to-include-an-image-in-the-exe-file
+def resource_path(relative_path):
+    # PyInstaller unpacks the data files next to the code, in sys._MEIPASS
+    base = getattr(sys, '_MEIPASS', '')
+    if system == 'linux':
+        relative_path = '/'.join(relative_path.split('\\'))
+    return os.path.join(base, relative_path) if base else relative_path
+
+def user_folder():
+    # Settings and data of the user : sys._MEIPASS is a temporary folder, removed when a onefile build exits
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_DATA_HOME') or os.path.join(Path.home(), '.local', 'share')
+    return os.path.join(base, 'AccidentReportForm')
+
+def resource_name(relative_path):
+    # Name of a resource in the bundle
+    return '/'.join(relative_path.split('\\'))
+
+
+class Bundle:
+    # Uncompressed zip mapped in memory, the members are read without going through zipfile
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.members = {}
+        with zipfile.ZipFile(self.data) as archive:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f"{path}: {info.filename} is compressed")
+                # The local header is 30 bytes, followed by the name and the extra field
+                header = self.data[info.header_offset:info.header_offset + 30]
+                start = info.header_offset + 30 + int.from_bytes(header[26:28], 'little') + int.from_bytes(header[28:30], 'little')
+                self.members[info.filename] = (start, info.file_size)
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def read(self, name):
+        start, size = self.members[name]
+        return self.data[start:start + size]
+
+    def names(self, folder):
+        prefix = folder.rstrip('/') + '/'
+        return [name[len(prefix):] for name in self.members if name.startswith(prefix) and '/' not in name[len(prefix):]]
+
+_bundle = []
+
+def bundle():
+    # The bundle of a packaged build, None when the resources are loose files
+    if not _bundle:
+        path = resource_path(BUNDLE)
+        _bundle.append(Bundle(path) if os.path.exists(path) else None)
+    return _bundle[0]
+
+
+# The loose files come first, so that a source checkout never reads a stale bundle
+
+def resource_bytes(relative_path):
+    path = resource_path(relative_path)
+    packed = bundle()
+    if packed is not None and resource_name(relative_path) in packed and not os.path.exists(path):
+        return packed.read(resource_name(relative_path))
+    with open(path, 'rb') as f:
+        return f.read()
+
+def resource_exists(relative_path):
+    if os.path.exists(resource_path(relative_path)):
+        return True
+    packed = bundle()
+    return packed is not None and resource_name(relative_path) in packed
+
+def resource_listdir(relative_folder):
+    folder = resource_path(relative_folder)
+    packed = bundle()
+    if packed is None or os.path.isdir(folder):
+        return os.listdir(folder)
+    return packed.names(resource_name(relative_folder))
+
+def resource_file(relative_path):
+    # For the few readers that need a real file (Qt style sheets, picture cache keys) : the bundled
+    # file is written to the temporary folder, named after its content so that every build of the
+    # same file shares one copy, and the copies of the other builds are removed
+    path = resource_path(relative_path)
+    packed = bundle()
+    name = resource_name(relative_path)
+    if packed is None or os.path.exists(path) or name not in packed:
+        return path
+    data = packed.read(name)
+    folder = os.path.join(tempfile.gettempdir(), 'AccidentReportForm', *name.split('/'))
+    target = os.path.join(folder, f"{hashlib.sha1(data).hexdigest()[:16]}-{os.path.basename(name)}")
+    if not os.path.exists(target):
+        os.makedirs(folder, exist_ok=True)
+        for entry in os.listdir(folder):
+            try:
+                os.remove(os.path.join(folder, entry))
+            except OSError:
+                # Still open by a running instance
+                pass
+        temp = f"{target}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, target)
+    return target
+
+
+def bundled_files():
+    files = list(BUNDLED_FILES)
+    for folder in BUNDLED_FOLDERS:
+        files += [f"{folder}\\{name}" for name in sorted(os.listdir(resource_path(folder)))]
+    # The compiled texts, checked and built by translations.py
+    files += [f"data\\texts\\{name}" for name in sorted(os.listdir(resource_path("data\\texts"))) if name.endswith(".catalog")]
+    return files
+
+def build_bundle(output=None):
+    from translations import compile_catalog
+    compile_catalog()
+    output = output or resource_path(BUNDLE)
+    temp = f"{output}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(temp, 'w', zipfile.ZIP_STORED) as archive:
+        for relative_path in bundled_files():
+            archive.write(resource_path(relative_path), resource_name(relative_path))
+    os.replace(temp, output)
+    return output
+
+
+if __name__ == '__main__':
+    path = build_bundle()
+    print(path, os.path.getsize(path))
@@ -0,0 +1,163 @@
+'''
+    Startup benchmark of the form
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python startup_benchmark.py [--repeat N] [--output results.json]
+                                       [--baseline previous.json] [--threshold 0.1]
+
+    Every run starts ReportFormApp() in a new process with the offscreen Qt
+    platform, so nothing is cached by a previous run, and stops it as soon as
+    the event loop is idle after the first paint of the window. The phases are
+    timed separately : imports, text loading, create_widgets(), setup_layout(),
+    first paint (from the end of setup_layout() to the first paint),
+    interactive (from the first import to the idle event loop) and process
+    (wall time of the whole process, interpreter startup and exit included).
+    The number of widgets and of setStyleSheet() calls are reported too.
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("imports", "text_loading", "create_widgets", "setup_layout", "first_paint", "interactive", "process")
+
+
+def run_startup():
+    # Runs in its own process, the timings of a warm interpreter would be meaningless
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    import current
+    from PyQt5 import QtCore
+    from PyQt5.QtWidgets import QApplication, QWidget
+    times = {"imports": time.perf_counter() - start}
+    counts = {"setStyleSheet": 0}
+
+    def timed(phase, function):
+        def wrapper(*args, **kwargs):
+            begin = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                times[phase] = time.perf_counter() - begin
+                times[phase + "_end"] = time.perf_counter()
+        return wrapper
+
+    set_style_sheet = QWidget.setStyleSheet
+    def counted_set_style_sheet(widget, style):
+        counts["setStyleSheet"] += 1
+        set_style_sheet(widget, style)
+
+    class FirstPaint(QtCore.QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QtCore.QEvent.Paint and isinstance(watched, QWidget) and watched.isWindow():
+                QApplication.instance().removeEventFilter(self)
+                times["first_paint"] = time.perf_counter() - times.pop("setup_layout_end")
+                QtCore.QTimer.singleShot(0, interactive)
+            return False
+
+    def interactive():
+        times["interactive"] = time.perf_counter() - start
+        counts["widgets"] = len(QApplication.allWidgets())
+        QApplication.quit()
+
+    first_paint = FirstPaint()
+    def exec_until_interactive(app):
+        app.installEventFilter(first_paint)
+        return QApplication.exec_()
+
+    current.load_texts = timed("text_loading", current.load_texts)
+    current.ReportFormApp.create_widgets = timed("create_widgets", current.ReportFormApp.create_widgets)
+    current.ReportFormApp.setup_layout = timed("setup_layout", current.ReportFormApp.setup_layout)
+    QWidget.setStyleSheet = counted_set_style_sheet
+    QApplication.exec = exec_until_interactive
+    try:
+        current.ReportFormApp()
+    except SystemExit:
+        pass
+    times = {phase: duration for phase, duration in times.items() if not phase.endswith("_end")}
+    return {"times": times, "counts": counts}
+
+def run_in_process():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    process = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"startup failed:\n{result.stderr}")
+    run = json.loads(result.stdout)
+    # Seen from outside : interpreter startup, the form, and the exit
+    run["times"]["process"] = process
+    return run
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, after in results["times"].items():
+        before = baseline["times"].get(key)
+        if before and (after - before) / before > threshold:
+            regressions.append(f"{key} {before*1000:.1f} ms -> {after*1000:.1f} ms (+{(after - before) / before:.0%})")
+    for key, after in results["counts"].items():
+        before = baseline["counts"].get(key)
+        if before is not None and after > before:
+            regressions.append(f"{key} {before} -> {after}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the startup of the form.")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="number of processes started")
+    parser.add_argument("-o", "--output", help="JSON file receiving the results")
+    parser.add_argument("-b", "--baseline", help="JSON file of a previous run to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="relative increase counted as a regression")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(run_startup()))
+        return 0
+    runs = []
+    for _ in range(args.repeat):
+        try:
+            runs.append(run_in_process())
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+            return 1
+    results = {
+        "times": {phase: statistics.median(run["times"][phase] for run in runs) for phase in PHASES},
+        "best": {phase: min(run["times"][phase] for run in runs) for phase in PHASES},
+        "counts": runs[-1]["counts"],
+    }
+    print(f"{'phase':<18}{'best (ms)':>11}{'median (ms)':>13}")
+    for phase in PHASES:
+        print(f"{phase:<18}{results['best'][phase]*1000:>11.1f}{results['times'][phase]*1000:>13.1f}")
+    for key, count in results["counts"].items():
+        print(f"{key:<18}{count:>11}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "repeat": args.repeat, "results": results}, f, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print("regression", line)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
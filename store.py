@@ -0,0 +1,411 @@
+'''
+    Local database of the exported reports
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python store.py import reports.jsonl [--database FILE] [--language fr]
+           python store.py find [--database FILE] [--from 2024-01-01] [--to 2024-12-31]
+                                [--category category_1] [--report-type report_2]
+                                [--injury injury_2] [--place TEXT]
+                                [--situation situation_12] [--organ body_7] [--count]
+           python store.py search "echelle genou" [--database FILE] [--limit 20]
+                                  [and the options of find]
+
+    Every exported report is kept in an SQLite database, one row per report
+    in the report table plus one row per checked situation, body part and
+    attachment, so that years of reports are queried through indexes. The
+    dates are stored as yyyy-mm-dd. The situations and body parts are also
+    kept as the bitmasks of report.py, for the aggregations that read every
+    row.
+
+    The form doesn't wait for the database : ReportStore writes from its own
+    thread, in WAL mode, so that the readers are never blocked either.
+
+    The free texts are indexed by an FTS5 table kept up to date by triggers,
+    so an imported or exported report is searchable as soon as it is stored.
+    The accents are ignored ("echelle" finds "échelle" and "rucken" finds
+    "Rücken") and every word of a search is a prefix, the 2 and 3 letter
+    prefixes having an index of their own.
+'''
+
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from resources import user_folder
+from report import report_from_answer, mask_numbers, mask_to_names, selection_number, SITUATION_COUNT, BODY_COUNT
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS report (
+    id INTEGER PRIMARY KEY,
+    exported TEXT NOT NULL,
+    language TEXT NOT NULL,
+    category TEXT,
+    report_type TEXT,
+    date TEXT,
+    hour TEXT,
+    place TEXT NOT NULL,
+    equipment TEXT NOT NULL,
+    people TEXT NOT NULL,
+    situation INTEGER NOT NULL,
+    other_situation TEXT NOT NULL,
+    description TEXT NOT NULL,
+    injury TEXT,
+    organs INTEGER NOT NULL,
+    comments TEXT NOT NULL,
+    logo TEXT NOT NULL,
+    file TEXT
+);
+CREATE TABLE IF NOT EXISTS report_situation (
+    situation INTEGER NOT NULL,
+    report_id INTEGER NOT NULL REFERENCES report(id) ON DELETE CASCADE,
+    PRIMARY KEY (situation, report_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS report_organ (
+    organ INTEGER NOT NULL,
+    report_id INTEGER NOT NULL REFERENCES report(id) ON DELETE CASCADE,
+    PRIMARY KEY (organ, report_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS attachment (
+    report_id INTEGER NOT NULL REFERENCES report(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (report_id, position)
+) WITHOUT ROWID;
+-- Covers the date filters and the body parts of the injured reports read by heatmap.py, without reading the texts
+CREATE INDEX IF NOT EXISTS report_date_organs ON report (date, injury, organs);
+CREATE INDEX IF NOT EXISTS report_category ON report (category, date);
+CREATE INDEX IF NOT EXISTS report_report_type ON report (report_type, date);
+CREATE INDEX IF NOT EXISTS report_injury ON report (injury, date);
+CREATE INDEX IF NOT EXISTS report_place ON report (place COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS report_situation_report ON report_situation (report_id);
+CREATE INDEX IF NOT EXISTS report_organ_report ON report_organ (report_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS report_text USING fts5 (
+    description, comments, people, equipment, place, other_situation,
+    content='report', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS report_text_insert AFTER INSERT ON report BEGIN
+    INSERT INTO report_text (rowid, description, comments, people, equipment, place, other_situation)
+    VALUES (new.id, new.description, new.comments, new.people, new.equipment, new.place, new.other_situation);
+END;
+CREATE TRIGGER IF NOT EXISTS report_text_delete AFTER DELETE ON report BEGIN
+    INSERT INTO report_text (report_text, rowid, description, comments, people, equipment, place, other_situation)
+    VALUES ('delete', old.id, old.description, old.comments, old.people, old.equipment, old.place, old.other_situation);
+END;
+CREATE TRIGGER IF NOT EXISTS report_text_update AFTER UPDATE ON report BEGIN
+    INSERT INTO report_text (report_text, rowid, description, comments, people, equipment, place, other_situation)
+    VALUES ('delete', old.id, old.description, old.comments, old.people, old.equipment, old.place, old.other_situation);
+    INSERT INTO report_text (rowid, description, comments, people, equipment, place, other_situation)
+    VALUES (new.id, new.description, new.comments, new.people, new.equipment, new.place, new.other_situation);
+END;
+"""
+
+# Number of matches of a search that are ranked by default, the most recent ones
+RANK_CANDIDATES = 500
+
+REPORT_COLUMNS = ("exported", "language", "category", "report_type", "date", "hour", "place", "equipment", "people",
+                  "situation", "other_situation", "description", "injury", "organs", "comments", "logo", "file")
+
+
+class StoreError(Exception):
+    pass
+
+
+def database_path():
+    return os.path.join(user_folder(), 'reports.db')
+
+def connect(path=None, readonly=False):
+    # readonly : for the commands that only read, a missing or empty database is an error rather than created
+    path = path or database_path()
+    if readonly:
+        if not os.path.isfile(path):
+            raise StoreError(f"{path}: no such database")
+        connection = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            connection.close()
+            raise StoreError(f"{path}: schema version {version}, this version reads {SCHEMA_VERSION}")
+        return connection
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        connection.close()
+        raise StoreError(f"{path}: schema version {version}, this version reads up to {SCHEMA_VERSION}")
+    if version < SCHEMA_VERSION:
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return connection
+
+def iso_date(text):
+    # The form shows dd/MM/yyyy, kept as it is when it is something else
+    parts = text.split('/')
+    if len(parts) == 3 and all(part.isdigit() for part in parts) and len(parts[2]) == 4:
+        return f"{parts[2]}-{int(parts[1]):02d}-{int(parts[0]):02d}"
+    return text or None
+
+def report_row(answer, language, file=None, exported=None):
+    report = report_from_answer(answer)
+    return {
+        "exported": exported or datetime.now().isoformat(timespec='seconds'),
+        "language": language,
+        "category": report.category or None,
+        "report_type": report.report_type or None,
+        "date": iso_date(report.date),
+        "hour": report.hour or None,
+        "place": report.place,
+        "equipment": report.equipment,
+        "people": report.people,
+        "situation": report.situation,
+        "other_situation": report.other_situation,
+        "description": report.description,
+        "injury": report.injury or None,
+        "organs": report.organs,
+        "comments": report.comments,
+        "logo": report.logo,
+        "file": file,
+    }
+
+def insert_report(connection, answer, language, file=None, exported=None):
+    # In the transaction of the caller
+    row = report_row(answer, language, file, exported)
+    cursor = connection.execute(f"INSERT INTO report ({', '.join(REPORT_COLUMNS)}) VALUES ({', '.join('?' * len(REPORT_COLUMNS))})",
+                                [row[column] for column in REPORT_COLUMNS])
+    report_id = cursor.lastrowid
+    connection.executemany("INSERT INTO report_situation (situation, report_id) VALUES (?, ?)",
+                           [(number, report_id) for number in mask_numbers(row["situation"])])
+    connection.executemany("INSERT INTO report_organ (organ, report_id) VALUES (?, ?)",
+                           [(number, report_id) for number in mask_numbers(row["organs"])])
+    connection.executemany("INSERT INTO attachment (report_id, position, path) VALUES (?, ?, ?)",
+                           [(report_id, position, path) for position, path in enumerate(answer.get("attachment", ()))])
+    return report_id
+
+def insert_reports(connection, items):
+    # items : (answer, language, file) tuples, written in a single transaction
+    with connection:
+        return [insert_report(connection, *item) for item in items]
+
+def import_answers(connection, path, language):
+    """Store the answer dicts of a JSON lines file, as read by batch.py, in a single transaction.
+    A line that can't be stored doesn't stop the others. Returns the number of stored reports
+    and the (line number, error) tuples of the other lines."""
+    stored, failed = 0, []
+    with connection, open(path, 'rb') as f:
+        connection.execute("BEGIN")
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                answer = json.loads(line)
+            except ValueError as error:
+                failed.append((number, f"invalid JSON line: {error}"))
+                continue
+            if not isinstance(answer, dict):
+                failed.append((number, "not a JSON object"))
+                continue
+            # A report that fails half way leaves none of its rows
+            connection.execute("SAVEPOINT line")
+            try:
+                insert_report(connection, answer, answer.get('language', language))
+                stored += 1
+            except Exception as error:
+                connection.execute("ROLLBACK TO line")
+                failed.append((number, repr(error)))
+            connection.execute("RELEASE line")
+    return stored, failed
+
+
+def report_filter(date_from=None, date_to=None, category=None, report_type=None, injury=None, place=None,
+                  situation=None, organ=None):
+    # Conditions on the report table and their parameters, the names are the ones of the answer dicts
+    clauses, params = [], []
+    for column, operator, value in (("date", ">=", date_from), ("date", "<=", date_to), ("category", "=", category),
+                                    ("report_type", "=", report_type), ("injury", "=", injury)):
+        if value is not None:
+            clauses.append(f"report.{column} {operator} ?")
+            params.append(value)
+    if place is not None:
+        clauses.append("report.place = ? COLLATE NOCASE")
+        params.append(place)
+    if situation is not None:
+        clauses.append("report.id IN (SELECT report_id FROM report_situation WHERE situation = ?)")
+        params.append(selection_number(situation))
+    if organ is not None:
+        clauses.append("report.id IN (SELECT report_id FROM report_organ WHERE organ = ?)")
+        params.append(selection_number(organ))
+    return clauses, params
+
+def where(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+def find_reports(connection, limit=None, **criteria):
+    clauses, params = report_filter(**criteria)
+    sql = f"SELECT * FROM report{where(clauses)} ORDER BY date DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return connection.execute(sql, params).fetchall()
+
+def count_reports(connection, **criteria):
+    clauses, params = report_filter(**criteria)
+    return connection.execute(f"SELECT count(*) FROM report{where(clauses)}", params).fetchone()[0]
+
+def match_query(text):
+    # Every word must be found, as the start of a word of the report ; the FTS5 syntax is not exposed
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+def search_reports(connection, text, limit=20, marks=("[", "]"), candidates=RANK_CANDIDATES, **criteria):
+    """Reports whose free texts contain every word of text, the best ones first. Only the candidates
+    most recent matching reports, by date, are ranked. Every row has the columns of the report table
+    plus rank (lower is better) and snippet, an extract of the best matching text with the found words
+    between marks. criteria are the ones of find_reports()."""
+    query = match_query(text)
+    if not query:
+        return []
+    clauses, params = report_filter(**criteria)
+    # The date index is read from the most recent report, + keeps SQLite from reading the matches by id instead
+    matching = "+report.id IN (SELECT rowid FROM report_text WHERE report_text MATCH ?)"
+    ids = [row[0] for row in connection.execute(f"SELECT report.id FROM report{where([matching] + clauses)}"
+                                                f" ORDER BY report.date DESC, report.id DESC LIMIT ?",
+                                                [query, *params, candidates])]
+    if not ids:
+        return []
+    # bm25() rather than rank, which FTS5 would compute for every match to sort them itself, and +
+    # so that the candidates are picked while reading the matches, not looked up one by one
+    sql = (f"SELECT report.*, bm25(report_text) AS rank, snippet(report_text, -1, ?, ?, '…', 12) AS snippet"
+           f" FROM report_text JOIN report ON report.id = report_text.rowid"
+           f" WHERE report_text MATCH ? AND +report_text.rowid IN (SELECT value FROM json_each(?)) ORDER BY rank LIMIT ?")
+    return connection.execute(sql, [*marks, query, json.dumps(ids), limit]).fetchall()
+
+class ReportStore:
+    """Writes the reports to the database from a thread of its own. add() only queues the
+    report, flush() waits until everything queued is written and close() stops the thread.
+    The reports queued while a transaction is running are written together in the next one."""
+
+    def __init__(self, path=None):
+        self.path = path or database_path()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="report-store", daemon=True)
+        self.thread.start()
+
+    def add(self, answer, language, file=None):
+        self.queue.put((answer, language, file))
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        connection = None
+        while True:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            reports = [item for item in items if item is not None]
+            try:
+                if reports:
+                    if connection is None:
+                        connection = connect(self.path)
+                    insert_reports(connection, reports)
+            except Exception:
+                # Whatever the error, the thread keeps writing the next reports
+                logger.exception("%d report(s) not stored in %s", len(reports), self.path)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+            if None in items:
+                if connection is not None:
+                    connection.execute("PRAGMA optimize")
+                    connection.close()
+                return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local database of the exported reports.")
+    parser.add_argument("-d", "--database", help="database file, a per-user file by default")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="store the answer dicts of a JSON lines file")
+    importer.add_argument("input", help="JSON lines file of answer dicts, as read by batch.py")
+    importer.add_argument("-l", "--language", default="fr", help="language of the lines without a 'language' key")
+    finder = commands.add_parser("find", help="list the stored reports")
+    searcher = commands.add_parser("search", help="search the free texts of the stored reports")
+    searcher.add_argument("text", help="words to find, accents and case are ignored")
+    for command in (finder, searcher):
+        command.add_argument("--from", dest="date_from", help="first date, yyyy-mm-dd")
+        command.add_argument("--to", dest="date_to", help="last date, yyyy-mm-dd")
+        for option in ("category", "report-type", "injury", "place"):
+            command.add_argument(f"--{option}")
+        command.add_argument("--situation", metavar="situation_N",
+                             choices=[f"situation_{n}" for n in range(1, SITUATION_COUNT + 1)])
+        command.add_argument("--organ", metavar="body_N", choices=[f"body_{n}" for n in range(1, BODY_COUNT + 1)])
+    finder.add_argument("--limit", type=int)
+    finder.add_argument("--count", action="store_true", help="only print the number of reports")
+    searcher.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    try:
+        connection = connect(args.database, readonly=args.command != "import")
+    except (sqlite3.Error, OSError, StoreError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    if args.command == "import":
+        stored, failed = import_answers(connection, args.input, args.language)
+        for number, error in failed:
+            print(f"line {number}: {error}", file=sys.stderr)
+        print(stored, "report(s) stored")
+        # Statistics of the indexes for the query planner
+        connection.execute("PRAGMA optimize")
+        return 1 if failed else 0
+    criteria = dict(date_from=args.date_from, date_to=args.date_to, category=args.category, report_type=args.report_type,
+                    injury=args.injury, place=args.place, situation=args.situation, organ=args.organ)
+    if args.command == "search":
+        for row in search_reports(connection, args.text, limit=args.limit, **criteria):
+            print(row["id"], row["date"], row["place"], row["snippet"].replace("\n", " "), sep="\t")
+        return 0
+    if args.count:
+        print(count_reports(connection, **criteria))
+        return 0
+    for row in find_reports(connection, limit=args.limit, **criteria):
+        print(row["id"], row["date"], row["category"], row["report_type"], row["injury"], row["place"],
+              " ".join(mask_to_names(row["organs"], "body_")), sep="\t")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+'''
+    Tests of the report model and of the report database
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    Usage: python test.py   (or python -m pytest test.py)
+
+    Neither Qt nor the PDF generator is needed, the database is in memory.
+'''
+
+import unittest
+from report import (Report, report_to_answer, report_from_answer, names_to_mask, mask_to_names,
+                    SITUATION_COUNT, BODY_COUNT, OTHER_SITUATION)
+from store import connect, insert_report, find_reports, count_reports, search_reports
+
+
+class MaskTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        names = ["body_1", "body_7", f"body_{BODY_COUNT}"]
+        mask = names_to_mask(names, BODY_COUNT)
+        self.assertEqual(mask, 1 | 1 << 6 | 1 << (BODY_COUNT - 1))
+        self.assertEqual(mask_to_names(mask, "body_"), names)
+        self.assertEqual(names_to_mask([]), 0)
+        self.assertEqual(mask_to_names(0, "situation_"), [])
+
+    def test_out_of_range(self):
+        for name in ("situation_0", f"situation_{SITUATION_COUNT + 1}", "situation_x", "situation_"):
+            with self.assertRaisesRegex(ValueError, name):
+                names_to_mask([name], SITUATION_COUNT)
+        with self.assertRaisesRegex(ValueError, f"body_{BODY_COUNT + 1}"):
+            report_from_answer({"injury": "injury_2", "organs": [f"body_{BODY_COUNT + 1}"]})
+
+
+class AnswerTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        report = Report(category="category_1", report_type="report_2", date="12/03/2024", place="Hall B",
+                        situation=names_to_mask(["situation_2", "situation_12"]), injury="injury_3",
+                        organs=names_to_mask(["body_7"]), attachment=["photo.jpg"])
+        answer = report_to_answer(report)
+        self.assertEqual(answer["situation"], ["situation_2", "situation_12"])
+        self.assertEqual(answer["organs"], ["body_7"])
+        again = report_from_answer(answer)
+        for field in Report.__slots__:
+            self.assertEqual(getattr(again, field), getattr(report, field), field)
+        self.assertIsNot(again.attachment, report.attachment)
+
+    def test_other_situation(self):
+        report = report_from_answer({"situation": ["situation_3", "ladder"]})
+        self.assertEqual(report.other_situation, "ladder")
+        self.assertEqual(mask_to_names(report.situation, "situation_"), ["situation_3", OTHER_SITUATION])
+        # The text stands for the "other" situation, which is not given twice
+        self.assertEqual(report_to_answer(report)["situation"], ["situation_3", "ladder"])
+        self.assertEqual(report_from_answer(report_to_answer(report)).situation, report.situation)
+
+    def test_no_injury(self):
+        organs = names_to_mask(["body_7"])
+        for injury in ("", "None", "injury_1"):
+            self.assertEqual(report_to_answer(Report(injury=injury, organs=organs))["organs"], [])
+            self.assertEqual(report_from_answer({"injury": injury, "organs": ["body_7"]}).organs, 0)
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = connect(':memory:')
+        self.ids = [insert_report(self.connection, answer, "fr") for answer in (
+            {"date": "12/03/2024", "category": "category_1", "injury": "injury_2", "organs": ["body_7"],
+             "situation": ["situation_12"], "description": "Chute d'une échelle, genou droit"},
+            {"date": "14/05/2024", "category": "category_2", "injury": "injury_1", "organs": ["body_7"],
+             "situation": ["ladder"], "description": "Glissade sur le sol mouillé"},
+            {"date": "02/01/2023", "category": "category_1", "injury": "injury_3", "organs": ["body_3"],
+             "description": "Coupure à la main", "comments": "échelle rangée"},
+        )]
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_find(self):
+        rows = find_reports(self.connection)
+        self.assertEqual([row["id"] for row in rows], [self.ids[1], self.ids[0], self.ids[2]])
+        self.assertEqual(rows[1]["date"], "2024-03-12")
+        found = find_reports(self.connection, date_from="2024-01-01", category="category_1")
+        self.assertEqual([row["id"] for row in found], [self.ids[0]])
+        # The body parts of a report without injury are not stored
+        self.assertEqual([row["id"] for row in find_reports(self.connection, organ="body_7")], [self.ids[0]])
+        self.assertEqual(count_reports(self.connection, situation=OTHER_SITUATION), 1)
+        self.assertEqual(count_reports(self.connection, situation="situation_12"), 1)
+
+    def test_search(self):
+        rows = search_reports(self.connection, "echelle")
+        self.assertEqual({row["id"] for row in rows}, {self.ids[0], self.ids[2]})
+        self.assertIn("[échelle]", rows[0]["snippet"])
+        self.assertEqual([row["id"] for row in search_reports(self.connection, "ECHEL gen")], [self.ids[0]])
+        self.assertEqual([row["id"] for row in search_reports(self.connection, "echelle", date_to="2023-12-31")],
+                         [self.ids[2]])
+        # Only the most recent matches by date are ranked
+        self.assertEqual([row["id"] for row in search_reports(self.connection, "echelle", candidates=1)], [self.ids[0]])
+        self.assertEqual(search_reports(self.connection, "escalier"), [])
+        self.assertEqual(search_reports(self.connection, "  "), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
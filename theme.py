@@ -0,0 +1,253 @@
+'''
+    Stylesheet of the form
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+    The whole form is styled by a single stylesheet set on the application,
+    so that Qt parses it once instead of once per widget. The widgets pick
+    their rules with their object name, and the variants (a disabled button,
+    the disabled "other" situation input) are pseudo-states of these rules.
+'''
+
+from functools import lru_cache
+from string import Template
+from assets import asset_path
+
+ACCENT_COLOR = 'teal'
+BACKGROUND_COLOR = '#e4fffd'
+
+STYLESHEET = Template("""
+#form, #form QWidget {
+    background: $background;
+}
+QLabel#title {
+    background: $accent;
+    font-size: 36px;
+    font-family: Ubuntu;
+    border-radius: 20px;
+    padding: 15%;
+    color: white;
+    margin-left: 80px;
+    margin-right: 80px;
+}
+QPushButton#flag {
+    border-style: 15px 'white' solid;
+    padding-left: 10px;
+}
+QLabel#subtitle {
+    margin: 20px;
+    color: black;
+    font-size: 20px;
+    text-decoration: underline;
+}
+QFrame#h_separator {
+    background-color: black;
+    margin-top: 15px;
+}
+QFrame#v_separator {
+    background-color: black;
+    margin-left: 10px;
+    padding-right: 150px;
+}
+QCheckBox#choice {
+    spacing: 5px;
+    font-size: 15px;
+}
+QCheckBox#choice::indicator {
+    width: 20px;
+    height: 20px;
+    border: 2px solid $accent;
+    border-radius: 4px;
+    background-color: white;
+}
+QCheckBox#choice::indicator:unchecked:hover {
+    background-color: $background;
+}
+QCheckBox#choice::indicator:checked {
+    background-color: $accent;
+    image: url('$check');
+}
+QLineEdit#input, QDateTimeEdit#date_input {
+    border: 2px solid $accent;
+    border-radius: 5px;
+    padding-top: 5px;
+    padding-bottom: 5px;
+    padding-left: 10px;
+    padding-right: 10px;
+    background-color: white;
+    font-size: 16px;
+}
+QDateTimeEdit#date_input {
+    padding-left: 5px;
+}
+QPushButton#calendar_button {
+    border-radius: 5px;
+    background-color: none;
+}
+QLineEdit#other_situation {
+    border: 2px solid $accent;
+    border-radius: 5px;
+    padding-left: 5px;
+    padding-right: 5px;
+    background-color: white;
+    margin-right: 35px;
+    font-size: 15px;
+}
+QLineEdit#other_situation:disabled {
+    border: none;
+    background-color: transparent;
+}
+QScrollArea#content {
+    border: none;
+    margin-top: 10px;
+    margin-bottom: 10px;
+}
+QScrollArea#content QScrollBar:vertical {
+    border: none;
+    background-color: transparent;
+    width: 19px;
+    margin: 0px 10px 0px 0px;
+}
+QScrollArea#content QScrollBar:vertical:hover {
+    border-radius: 7px;
+    background-color: #dadada;
+    margin: 0px 5px 0px 0px;
+}
+QScrollArea#content QScrollBar::handle:vertical {
+    background-color: $accent;
+    min-height: 20px;
+    border-radius: 4px;
+}
+QScrollArea#content QScrollBar::handle:vertical:hover {
+    border-radius: 7px;
+}
+QScrollArea#content QScrollBar::add-line:vertical, QScrollArea#content QScrollBar::sub-line:vertical {
+    border: none;
+    background-color: transparent;
+    height: 12px;
+    subcontrol-position: top;
+    subcontrol-origin: margin;
+}
+QTextEdit#text_area {
+    border: 2px solid $accent;
+    border-radius: 5px;
+    padding-top: 5px;
+    padding-bottom: 5px;
+    padding-left: 10px;
+    padding-right: 10px;
+    background-color: white;
+    font-size: 16px;
+    line-height: 20px;
+}
+QTextEdit#text_area QScrollBar:vertical {
+    border: none;
+    border-radius: 4px;
+    background-color: white;
+    width: 10px;
+    margin: 0px 3px 0px 0px;
+}
+QTextEdit#text_area QScrollBar:vertical:hover {
+    border-radius: 5px;
+    background-color: #dadada;
+    margin: 0px 0px 0px 0px;
+}
+QTextEdit#text_area QScrollBar::handle:vertical {
+    background-color: $accent;
+    min-height: 20px;
+    border-radius: 3px;
+}
+QTextEdit#text_area QScrollBar::handle:vertical:hover {
+    border-radius: 5px;
+}
+QTextEdit#text_area QScrollBar::add-line:vertical, QTextEdit#text_area QScrollBar::sub-line:vertical {
+    border: none;
+    background-color: transparent;
+    height: 12px;
+    subcontrol-position: top;
+    subcontrol-origin: margin;
+}
+QTextEdit#text_area QScrollBar:horizontal {
+    border: none;
+    border-radius: 4px;
+    background-color: white;
+    height: 10px;
+    margin: 0px 0px 3px 0px;
+}
+QTextEdit#text_area QScrollBar:horizontal:hover {
+    border-radius: 5px;
+    background-color: #dadada;
+    margin: 0px 0px 0px 0px;
+}
+QTextEdit#text_area QScrollBar::handle:horizontal {
+    background-color: $accent;
+    min-width: 20px;
+    border-radius: 3px;
+}
+QTextEdit#text_area QScrollBar::handle:horizontal:hover {
+    border-radius: 5px;
+}
+QTextEdit#text_area QScrollBar::add-line:horizontal, QTextEdit#text_area QScrollBar::sub-line:horizontal {
+    border: none;
+    background-color: transparent;
+    width: 12px;
+    subcontrol-position: left;
+    subcontrol-origin: margin;
+}
+QPushButton#button, QPushButton#clear_body {
+    border: 2px solid $accent;
+    border-radius: 5px;
+    background: $accent;
+    padding-top: 10px;
+    padding-bottom: 10px;
+    color: white;
+    margin-top: 0px;
+    margin-bottom: 0px;
+    font-size: 16px;
+}
+QPushButton#clear_body {
+    padding-top: 5px;
+    padding-bottom: 5px;
+}
+QPushButton#clear_body:disabled {
+    border: 2px solid grey;
+    background: grey;
+}
+QLabel#selected_organs {
+    font-size: 16px;
+}
+QGraphicsView#body_view {
+    border: none;
+}
+QPushButton#delete_logo {
+    border: none;
+    background-color: $accent;
+    padding-right: 4px;
+    padding-left: 4px;
+    padding-top: 6px;
+    padding-bottom: 6px;
+}
+QPushButton#attachment {
+    border: 2px solid black;
+    border-radius: 10px;
+    padding: 5px;
+    font-size: 16px;
+}
+""")
+
+
+@lru_cache(maxsize=None)
+def stylesheet(accent_color=ACCENT_COLOR, background_color=BACKGROUND_COLOR):
+    return STYLESHEET.substitute(accent=accent_color, background=background_color,
+                                 check=asset_path('check'))
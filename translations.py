@@ -0,0 +1,158 @@
+'''
+    Loading of the translated texts (data/texts/*.txt)
+    Copyright (C) 2023  Rémi Oblet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+import marshal
+import os
+import sys
+from resources import resource_path, resource_bytes, resource_listdir, user_folder
+
+
+# Languages shipped with the application, any data/texts/<lg>.txt file is also available
+LANGUAGES = ("fr", "en", "de")
+
+# Bumped whenever the layout of the compiled files changes
+CATALOG_VERSION = 1
+
+class TranslationError(ValueError):
+    pass
+
+
+def language_path():
+    # The language chosen in the form, data/texts/lg.txt is only the default
+    return os.path.join(user_folder(), 'lg.txt')
+
+def read_language():
+    try:
+        with open(language_path(), 'r') as f:
+            lg = f.read().strip()
+        if lg in available_languages():
+            return lg
+    except OSError:
+        pass
+    return resource_bytes('data\\texts\\lg.txt').decode().strip()
+
+def write_language(lg):
+    os.makedirs(user_folder(), exist_ok=True)
+    with open(language_path(), 'w') as f:
+        f.write(lg)
+
+def text_path(lg):
+    return resource_path(f"data\\texts\\{lg}.txt")
+
+def available_languages():
+    names = resource_listdir("data\\texts")
+    # A packaged build only has the compiled files
+    found = [name[:-4] for name in names if name.endswith(".txt") and name != "lg.txt"]
+    found = found or [name[:-8] for name in names if name.endswith(".catalog")]
+    return tuple(lg for lg in LANGUAGES if lg in found) + tuple(sorted(set(found) - set(LANGUAGES)))
+
+def compiled_path(lg):
+    return resource_path(f"data\\texts\\{lg}.catalog")
+
+def parse_texts(path):
+    # One "key = value" per line, empty lines are allowed
+    texts = {}
+    with open(path, 'r', encoding='utf8') as fichier:
+        for number, line in enumerate(fichier, start=1):
+            line = line.rstrip('\n')
+            if line.strip() == '':
+                continue
+            if " = " not in line:
+                raise TranslationError(f"{path}, line {number}: expected 'key = text', got {line!r}")
+            key, value = line.split(" = ", 1)
+            if key in texts:
+                raise TranslationError(f"{path}, line {number}: {key} is defined twice")
+            texts[key] = value
+    return texts
+
+def source_stamp(lg):
+    stat = os.stat(text_path(lg))
+    return [stat.st_mtime_ns, stat.st_size]
+
+def compile_catalog(languages=None):
+    """Checks every text file and writes its compiled version next to it.
+    All the languages must define the same keys. Returns the texts."""
+    languages = languages or available_languages()
+    texts = {lg: parse_texts(text_path(lg)) for lg in languages}
+    reference = languages[0]
+    for lg in languages[1:]:
+        missing = texts[reference].keys() - texts[lg].keys()
+        extra = texts[lg].keys() - texts[reference].keys()
+        if missing or extra:
+            raise TranslationError(f"{text_path(lg)}: missing {sorted(missing)}, unknown {sorted(extra)} compared to {reference}")
+
+    for lg in languages:
+        write_catalog(lg, texts[lg])
+    return texts
+
+def write_catalog(lg, texts):
+    data = {"version": CATALOG_VERSION, "source": source_stamp(lg), "texts": texts}
+    temp = compiled_path(lg) + f".{os.getpid()}.tmp"
+    try:
+        with open(temp, 'wb') as f:
+            marshal.dump(data, f)
+        os.replace(temp, compiled_path(lg))
+    except OSError:
+        # Read-only installation, the texts are parsed again on the next start
+        pass
+
+def load_language(lg):
+    if not os.path.exists(text_path(lg)):
+        # Packaged build : the compiled file comes from the resource bundle, checked when it was built
+        data = marshal.loads(resource_bytes(f"data\\texts\\{lg}.catalog"))
+        if data["version"] != CATALOG_VERSION:
+            raise TranslationError(f"{lg}.catalog: version {data['version']}, expected {CATALOG_VERSION}")
+        return data["texts"]
+    # The compiled file is used as long as the text file keeps the same modification time and size
+    try:
+        with open(compiled_path(lg), 'rb') as f:
+            data = marshal.load(f)
+        if data["version"] == CATALOG_VERSION and data["source"] == source_stamp(lg):
+            return data["texts"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+    # Only this language is compiled again, the keys of all of them are compared by compile_catalog()
+    texts = parse_texts(text_path(lg))
+    write_catalog(lg, texts)
+    return texts
+
+class Catalog(dict):
+    # texts[lg][key], where a language is only read the first time it is used
+    def __missing__(self, lg):
+        try:
+            self[lg] = load_language(lg)
+        except FileNotFoundError:
+            raise KeyError(lg)
+        return self[lg]
+
+def load_texts(languages=()):
+    # Only the given languages are read now, the others when they are first needed
+    texts = Catalog()
+    for lg in languages:
+        texts[lg]
+    return texts
+
+
+
+if __name__ == '__main__':
+    # python translations.py : checks the text files and compiles them, e.g. before packaging
+    try:
+        compile_catalog()
+    except TranslationError as error:
+        sys.exit(str(error))